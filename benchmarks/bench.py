@@ -0,0 +1,131 @@
+from typing import Any, Callable, Dict, List, Optional
+from collections import defaultdict
+import argparse
+import json
+import math
+import os
+import statistics
+import time
+import tracemalloc
+
+os.environ.setdefault("SCREENER_DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from benchmarks.fixtures import FixtureClient, available, load
+from models.scheduler import RequestScheduler
+from models.tables import Base
+from models.to_sql import ToSQL
+
+BUILD_STEPS: List[str] = [name for name in vars(ToSQL) if name.startswith("_ToSQL__build_")]
+UNLIMITED: RequestScheduler = RequestScheduler(rate=math.inf, limits={})
+
+
+class Recorder(object):
+    # Per-stage wall time, and with tracemalloc running the bytes still held and the peak reached by each stage
+    def __init__(self, trace: bool = False):
+        self.trace: bool = trace
+        self.times: Dict[str, float] = defaultdict(float)
+        self.held: Dict[str, int] = defaultdict(int)
+        self.peak: Dict[str, int] = defaultdict(int)
+
+    def run(self, stage: str, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        if self.trace:
+            tracemalloc.reset_peak()
+            before: int = tracemalloc.get_traced_memory()[0]
+        start: float = time.perf_counter()
+        result: Any = func(*args, **kwargs)
+        self.times[stage] += time.perf_counter() - start
+        if self.trace:
+            current, peak = tracemalloc.get_traced_memory()
+            self.held[stage] += current - before
+            self.peak[stage] = max(self.peak[stage], peak - before)
+        return result
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        def wrapped(*args: Any, **kwargs: Any) -> Any:
+            # Only the flag of the statement builders, __build_fingerprints takes the consolidated page second
+            consolidated: bool = kwargs.get("consolidated", len(args) > 1 and args[1] is True)
+            return self.run(stage + (" (consolidated)" if consolidated else ""), func, *args, **kwargs)
+        return wrapped
+
+
+def memory_session() -> Any:
+    engine: Any = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+def build(symbol: str, responses: Dict[str, bytes], db_session: Any, recorder: Recorder,
+          incremental: bool = False) -> None:
+    client: FixtureClient = FixtureClient(responses)
+    # Reruns over stored data would otherwise stop at the unchanged fingerprints, and fixtures need no rate limit
+    scraper: ToSQL = recorder.run("init", ToSQL, symbol, max_workers=1, db_session=db_session, client=client,
+                                  incremental=incremental, force=True, scheduler=UNLIMITED)
+    # Instance attributes shadow the private builders, so parse() runs the timed versions
+    for name in BUILD_STEPS:
+        setattr(scraper, name, recorder.wrap(name[len("_ToSQL__"):], getattr(scraper, name)))
+    recorder.run("fetch", scraper.fetch)
+    scraper.parse()
+    recorder.run("write", scraper.write)
+    recorder.run("commit", db_session.commit)
+
+
+def measure(symbol: str, responses: Dict[str, bytes], repeat: int, incremental: bool) -> Dict[str, Any]:
+    runs: List[Recorder] = []
+    for _ in range(repeat):
+        db_session: Any = memory_session()
+        if incremental:
+            build(symbol, responses, db_session, Recorder())
+        recorder: Recorder = Recorder()
+        build(symbol, responses, db_session, recorder, incremental=incremental)
+        runs.append(recorder)
+        db_session.close()
+
+    # Allocations are taken in a separate pass so tracing does not skew the timings
+    tracemalloc.start()
+    db_session = memory_session()
+    if incremental:
+        build(symbol, responses, db_session, Recorder())
+    traced: Recorder = Recorder(trace=True)
+    build(symbol, responses, db_session, traced, incremental=incremental)
+    db_session.close()
+    tracemalloc.stop()
+
+    stages: Dict[str, Dict[str, float]] = {}
+    for stage in runs[0].times:
+        stages[stage] = {
+            "ms": statistics.median(r.times[stage] for r in runs) * 1000,
+            "held_kib": traced.held[stage] / 1024,
+            "peak_kib": traced.peak[stage] / 1024,
+        }
+    total: float = statistics.median(sum(r.times.values()) for r in runs) * 1000
+    return {"symbol": symbol, "requests": len(responses), "total_ms": total, "stages": stages}
+
+
+def report(result: Dict[str, Any]) -> None:
+    print("{symbol}: {requests} responses, {total_ms:.1f} ms".format(**result))
+    print("  {:<48}{:>10}{:>12}{:>12}".format("stage", "ms", "held KiB", "peak KiB"))
+    for stage, row in result["stages"].items():
+        print("  {:<48}{:>10.2f}{:>12.1f}{:>12.1f}".format(stage, row["ms"], row["held_kib"], row["peak_kib"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time ToSQL stages against recorded fixtures and in-memory SQLite.")
+    parser.add_argument("symbols", nargs="*", help="fixtures to run, all of them by default")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per fixture, the median is reported")
+    parser.add_argument("--incremental", action="store_true", help="measure an incremental rerun over stored data")
+    parser.add_argument("--json", metavar="FILE", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    results: List[Dict[str, Any]] = []
+    for symbol in args.symbols or available():
+        result: Dict[str, Any] = measure(symbol, load(symbol), args.repeat, args.incremental)
+        report(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
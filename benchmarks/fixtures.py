@@ -0,0 +1,80 @@
+from typing import Any, Dict, List, NamedTuple, Optional
+import hashlib
+import json
+import os
+
+FIXTURES_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class Profile(NamedTuple):
+    symbol: str
+    seed: int
+    rows: int
+    periods: int
+    consolidated: bool
+
+
+# Representative shapes: a small standalone filer up to a large group with consolidated statements
+PROFILES: List[Profile] = [
+    Profile("SMALLCO", 1, 6, 8, False),
+    Profile("MIDCO", 2, 12, 12, True),
+    Profile("LARGECO", 3, 40, 13, True),
+    Profile("LARGESA", 4, 40, 13, False),
+]
+
+
+class Response(object):
+    def __init__(self, content: bytes):
+        self.content: bytes = content
+
+
+class FixtureClient(object):
+    # Serves recorded responses in place of HttpClient, unknown URLs fail like a 404 would
+    def __init__(self, responses: Dict[str, bytes]):
+        self.responses: Dict[str, bytes] = responses
+        self.calls: int = 0
+
+    def get(self, url: str, **kwargs: Any) -> Response:
+        self.calls += 1
+        content: Optional[bytes] = self.responses.get(url)
+        if content is None:
+            raise KeyError("No fixture recorded for {}".format(url))
+        return Response(content)
+
+    def close(self) -> None:
+        pass
+
+
+def file_name(url: str) -> str:
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+
+def save(symbol: str, responses: Dict[str, bytes], directory: str = FIXTURES_DIR) -> str:
+    path: str = os.path.join(directory, symbol)
+    os.makedirs(path, exist_ok=True)
+    index: Dict[str, str] = {}
+    for url, content in sorted(responses.items()):
+        name: str = file_name(url)
+        with open(os.path.join(path, name), "wb") as f:
+            f.write(content)
+        index[url] = name
+    with open(os.path.join(path, "index.json"), "w") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    return path
+
+
+def load(symbol: str, directory: str = FIXTURES_DIR) -> Dict[str, bytes]:
+    path: str = os.path.join(directory, symbol)
+    with open(os.path.join(path, "index.json")) as f:
+        index: Dict[str, str] = json.load(f)
+    responses: Dict[str, bytes] = {}
+    for url, name in index.items():
+        with open(os.path.join(path, name), "rb") as f:
+            responses[url] = f.read()
+    return responses
+
+
+def available(directory: str = FIXTURES_DIR) -> List[str]:
+    if not os.path.isdir(directory):
+        return []
+    return sorted(d for d in os.listdir(directory) if os.path.isfile(os.path.join(directory, d, "index.json")))
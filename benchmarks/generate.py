@@ -0,0 +1,106 @@
+from typing import Any, Dict, List, Set
+import json
+import random
+
+# Synthetic payloads shaped like screener.in pages and APIs, deterministic for a given seed
+QUARTERS: List[str] = ["Mar 2019", "Jun 2019", "Sep 2019", "Dec 2019", "Mar 2020", "Jun 2020", "Sep 2020", "Dec 2020",
+                       "Mar 2021", "Jun 2021", "Sep 2021", "Dec 2021", "Mar 2022"]
+YEARS: List[str] = ["Mar 2010", "Mar 2011", "Mar 2012", "Mar 2013", "Mar 2014", "Mar 2015", "Mar 2016", "Mar 2017",
+                    "Mar 2018", "Mar 2019", "Mar 2020", "Mar 2021", "TTM"]
+ROWS: List[str] = ["Sales", "Expenses", "Operating Profit", "OPM %", "Other Income", "Interest", "Depreciation",
+                   "Profit before tax", "Tax %", "Net Profit", "EPS in Rs", "Dividend Payout %"]
+EXPANDABLE: Set[str] = {"Sales", "Expenses", "Other Income", "Net Profit"}
+HOLDERS: List[str] = ["Promoters", "FIIs", "DIIs", "Public"]
+
+
+def _table(section: str, periods: List[str], rows: List[str], rnd: random.Random, shareholding: bool = False) -> str:
+    parts: List[str] = ['<table class="data-table"><thead><tr><th class="text"></th>']
+    parts += ["<th>{}</th>".format(period) for period in periods]
+    parts.append("</tr></thead><tbody>")
+    for row in rows:
+        label: str = row
+        if row.split(" #")[0] in EXPANDABLE or (shareholding and row in ("Promoters", "FIIs")):
+            if shareholding:
+                onclick: str = "Company.showShareholders('{}', this)".format(row.lower())
+            else:
+                onclick: str = "Company.showSchedule('{}', '{}', this)".format(row, section)
+            label = '<button class="button-plain" onclick="{}">{}&nbsp;<span class="blue-icon">+</span></button>'.format(
+                onclick, row)
+        cells: str = "".join("<td>{:,}</td>".format(rnd.randint(-500, 90000)) for _ in periods)
+        parts.append('<tr><td class="text">{}</td>{}</tr>'.format(label, cells))
+    if section == "quarters":
+        parts.append('<tr><td class="text">Raw PDF</td>{}</tr>'.format(
+            "".join('<td><a href="#">PDF</a></td>' for _ in periods)))
+    parts.append("</tbody></table>")
+    return "".join(parts)
+
+
+def _ranges(title: str, labels: List[str], rnd: random.Random) -> str:
+    rows: str = "".join("<tr><td>{}</td><td>{}%</td></tr>".format(label, rnd.randint(-20, 40)) for label in labels)
+    return '<table class="ranges-table"><tr><th colspan="2">{}</th></tr>{}</table>'.format(title, rows)
+
+
+def page(symbol: str, seed: int, rows: int, periods: int, consolidated: bool) -> str:
+    rnd: random.Random = random.Random(seed)
+    names: List[str] = [ROWS[i % len(ROWS)] + ("" if i < len(ROWS) else " #{}".format(i)) for i in range(rows)]
+    quarters: List[str] = QUARTERS[-periods:]
+    years: List[str] = YEARS[-periods:]
+    ratios: List[str] = ["₹ {:,} Cr.".format(rnd.randint(100, 900000)), "₹ {:,}".format(rnd.randint(10, 5000)),
+                         "₹ {:,} / {:,}".format(rnd.randint(2000, 3000), rnd.randint(10, 1999)),
+                         "{:.1f}".format(rnd.uniform(2, 90)), "₹ {:,}".format(rnd.randint(10, 900)),
+                         "{:.2f} %".format(rnd.uniform(0, 5)), "{:.1f} %".format(rnd.uniform(-5, 40)),
+                         "{:.1f} %".format(rnd.uniform(-5, 40)), "₹ {}".format(rnd.choice([1, 2, 5, 10]))]
+
+    parts: List[str] = ['<html><head><meta charset="utf-8"><title>{}</title></head><body>'.format(symbol)]
+    parts.append('<div id="top"><div><h1>{0} Ltd</h1></div><div><a><span>www.{1}.com</span></a>'
+                 '<a><span>BSE: {2}</span></a><a><span>NSE: {0}</span></a></div></div>'.format(
+                     symbol, symbol.lower(), 500000 + seed))
+    if consolidated:
+        parts.append('<a href="/company/{}/consolidated/">View Consolidated</a>'.format(symbol))
+    parts.append('<div id="company-info" data-warehouse-id="{}"></div>'.format(9000 + seed))
+    parts.append('<ul id="top-ratios">{}</ul>'.format("".join(
+        '<li><span class="name">Ratio</span><span class="nowrap value">\n    {}\n  </span></li>'.format(value)
+        for value in ratios)))
+    parts.append('<section id="peers"><h2>Peer comparison</h2><p>Sector: Energy Industry: Refineries</p></section>')
+    parts.append('<section id="quarters">{}</section>'.format(_table("quarters", quarters, names, rnd)))
+    parts.append('<section id="profit-loss"><div data-result-table>{}</div>{}{}{}{}</section>'.format(
+        _table("profit-loss", years, names, rnd),
+        _ranges("Compounded Sales Growth", ["10 Years:", "5 Years:", "3 Years:", "TTM:"], rnd),
+        _ranges("Compounded Profit Growth", ["10 Years:", "5 Years:", "3 Years:", "TTM:"], rnd),
+        _ranges("Stock Price CAGR", ["10 Years:", "5 Years:", "3 Years:", "1 Year:"], rnd),
+        _ranges("Return on Equity", ["10 Years:", "5 Years:", "3 Years:", "Last Year:"], rnd)))
+    for section in ("balance-sheet", "cash-flow", "ratios"):
+        parts.append('<section id="{}">{}</section>'.format(section, _table(section, years, names, rnd)))
+    parts.append('<section id="shareholding">{}{}</section>'.format(
+        _table("shareholding", quarters, HOLDERS, rnd, shareholding=True),
+        _table("shareholding", years, HOLDERS, rnd, shareholding=True)))
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def peers(seed: int, count: int = 10) -> str:
+    rnd: random.Random = random.Random(seed)
+    head: str = "".join("<th>{}</th>".format(h) for h in [
+        "S.No.", "Name", "CMP Rs.", "P/E", "Mar Cap Rs.Cr.", "Div Yld %", "NP Qtr Rs.Cr.", "Qtr Profit Var %",
+        "Sales Qtr Rs.Cr.", "Qtr Sales Var %", "ROCE %"])
+    body: str = "".join("<tr><td>{}.</td><td><a>Peer {}</a></td>{}</tr>".format(
+        i + 1, i, "".join("<td>{:,.2f}</td>".format(rnd.uniform(0, 90000)) for _ in range(9))) for i in range(count))
+    foot: str = "<tr><td></td><td>Median: {} Co.</td>{}</tr>".format(
+        count, "".join("<td>{:.2f}</td>".format(rnd.uniform(0, 100)) for _ in range(9)))
+    return "<div><table><thead><tr>{}</tr></thead><tbody>{}</tbody><tfoot>{}</tfoot></table></div>".format(
+        head, body, foot)
+
+
+def schedule(parent: str, seed: int, rows: int = 4) -> str:
+    # Rows carry every known period, the scraper only keeps the ones in the table header
+    rnd: random.Random = random.Random("{}-{}".format(parent, seed))
+    data: Dict[str, Any] = {}
+    for i in range(rows):
+        values: Dict[str, Any] = {period: "{:,}".format(rnd.randint(0, 40000)) for period in QUARTERS + YEARS}
+        values["setAttributes"] = {"data-person-name": parent}
+        data["{} part {}".format(parent, i + 1)] = values
+    return json.dumps(data)
+
+
+def search(symbol: str, seed: int) -> str:
+    return json.dumps([{"id": 100 + seed, "name": "{} Ltd".format(symbol), "url": "/company/{}/".format(symbol)}])
@@ -0,0 +1,68 @@
+from typing import Any, Dict
+import argparse
+import os
+
+os.environ.setdefault("SCREENER_DATABASE_URL", "sqlite://")
+
+from benchmarks import generate
+from benchmarks.fixtures import FIXTURES_DIR, PROFILES, Profile, Response, save
+
+
+class RecordingClient(object):
+    # Either generates synthetic payloads for a profile or forwards to the live site, keeping every response
+    def __init__(self, profile: Profile, live: Any = None):
+        self.profile: Profile = profile
+        self.live: Any = live
+        self.responses: Dict[str, bytes] = {}
+
+    def get(self, url: str, **kwargs: Any) -> Response:
+        if self.live is not None:
+            content: bytes = self.live.get(url, **kwargs).content
+        else:
+            content: bytes = self.__generate(url).encode("utf-8")
+        self.responses[url] = content
+        return Response(content)
+
+    def __generate(self, url: str) -> str:
+        p: Profile = self.profile
+        if "/search/" in url:
+            return generate.search(p.symbol, p.seed)
+        if "/peers/" in url:
+            return generate.peers(p.seed)
+        if "/schedules/" in url:
+            return generate.schedule(url.split("parent=")[1].split("&")[0], p.seed + ("consolidated" in url))
+        if "/investors/" in url:
+            return generate.schedule(url.rstrip("/").split("/")[-1], p.seed)
+        if "/consolidated/" in url:
+            return generate.page(p.symbol, p.seed + 100, p.rows, p.periods, True)
+        return generate.page(p.symbol, p.seed, p.rows, p.periods, p.consolidated)
+
+    def close(self) -> None:
+        pass
+
+
+def record(profile: Profile, directory: str, live: Any = None) -> str:
+    from models.to_sql import ToSQL
+
+    client: RecordingClient = RecordingClient(profile, live)
+    ToSQL(profile.symbol, client=client).fetch()
+    return save(profile.symbol, client.responses, directory)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record the responses ToSQL requests into benchmark fixtures.")
+    parser.add_argument("--out", default=FIXTURES_DIR, help="fixture directory")
+    parser.add_argument("--live", nargs="*", metavar="SYMBOL",
+                        help="record these symbols from screener.in instead of the synthetic profiles")
+    args = parser.parse_args()
+
+    if args.live:
+        from models.client import HttpClient
+
+        http: HttpClient = HttpClient()
+        for symbol in args.live:
+            print(record(Profile(symbol, 0, 0, 0, False), args.out, live=http))
+        http.close()
+    else:
+        for p in PROFILES:
+            print(record(p, args.out))
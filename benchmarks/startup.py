@@ -0,0 +1,51 @@
+from typing import Dict, List, Tuple
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (name, interpreter arguments, budget in seconds) for a cold process
+CASES: List[Tuple[str, List[str], float]] = [
+    ("main.py --help", ["main.py", "--help"], 0.25),
+    ("import models.batch", ["-c", "import models.batch"], 0.8),
+    ("import models.to_sql", ["-c", "import models.to_sql"], 1.2),
+]
+
+# Importing must neither connect nor pull in pandas, both are deferred to first use
+CHECK: str = """
+import sys
+import models.to_sql, models.batch, models.pipeline
+import models.tables as tables
+assert tables._engine is None, "engine created at import"
+assert "pandas" not in sys.modules, "pandas imported at import"
+"""
+
+
+def run(args: List[str], env: Dict[str, str]) -> float:
+    start: float = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold start times against a budget.")
+    parser.add_argument("--repeat", type=int, default=5, help="processes per case, the median is compared")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget, for slower machines")
+    args = parser.parse_args()
+
+    env: Dict[str, str] = dict(os.environ)
+    env.setdefault("SCREENER_DATABASE_URL", "sqlite://")
+
+    over: int = 0
+    subprocess.run([sys.executable, "-c", CHECK], cwd=ROOT, env=env, check=True)
+    for name, case, budget in CASES:
+        run(case, env)  # warms the OS file cache
+        median: float = statistics.median(run(case, env) for _ in range(args.repeat))
+        ok: bool = median <= budget * args.scale
+        over += not ok
+        print("{:<24}{:>8.3f}s  budget {:.3f}s  {}".format(name, median, budget * args.scale, "ok" if ok else "OVER"))
+    sys.exit(1 if over else 0)
@@ -1,12 +1,83 @@
-from models.to_sql import ToSQL
 import argparse
+import logging
+import sys
 
 parser = argparse.ArgumentParser()
 
-parser.add_argument("company_name", help="The name of the company (nse) or (bse)")
+parser.add_argument("company_name", nargs="?", help="The name of the company (nse) or (bse)")
+parser.add_argument("--batch", metavar="FILE", help="File with one symbol per line, - to read from stdin")
+parser.add_argument("--workers", type=int, default=None, help="Number of worker processes, defaults to the CPU count")
+parser.add_argument("--pipeline", action="store_true",
+                    help="Run the batch as one streaming fetch, parse and write pipeline instead of a process pool")
+parser.add_argument("--cache-dir", default=None, help="Cache HTTP responses on disk in this directory")
+parser.add_argument("--replay", action="store_true", help="Build the database from cached responses only")
+parser.add_argument("--incremental", action="store_true",
+                    help="Update the stored statements in place instead of deleting and re-inserting the company")
+parser.add_argument("--force", action="store_true",
+                    help="Rebuild every company, even when its pages did not change since the previous run")
+parser.add_argument("--low-memory", action="store_true",
+                    help="Keep memory flat on long runs: write statements one at a time and commit large companies in "
+                         "chunks")
+parser.add_argument("--journal", metavar="FILE", default=None,
+                    help="Record the batch's progress in this SQLite file and resume it from there after a restart")
+parser.add_argument("--export", metavar="DIR", default=None,
+                    help="Write a Parquet snapshot of all stored statements to this directory after the run")
+parser.add_argument("--metrics-log", action="store_true", help="Log per-company stage timings and counters")
+parser.add_argument("--metrics-json", metavar="FILE", help="Append per-company metrics to this file as JSON lines")
+parser.add_argument("--metrics-prom", metavar="FILE", help="Keep run totals in this file in the Prometheus text format")
+parser.add_argument("--metrics-port", type=int, default=None, help="Serve run totals for Prometheus on this port")
 
-args = parser.parse_args()
-name = args.company_name
-app = ToSQL(name)
-app.build()
 
+
+def metric_hooks(args: argparse.Namespace) -> list:
+    from models.metrics import JsonHook, LogHook, PrometheusHook
+
+    hooks = []
+    if args.metrics_log:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+        hooks.append(LogHook())
+    if args.metrics_json:
+        hooks.append(JsonHook(args.metrics_json))
+    if args.metrics_prom or args.metrics_port:
+        hooks.append(PrometheusHook(args.metrics_prom, args.metrics_port))
+    return hooks
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    hooks = metric_hooks(args)
+
+    if args.batch:
+        from models.batch import open_cache, read_symbols, run_batch, print_report
+
+        symbols = read_symbols(args.batch)
+        if args.pipeline:
+            from models.pipeline import Pipeline
+
+            pipeline = Pipeline(cache=open_cache(args.cache_dir, args.replay), report=print_report,
+                                hooks=hooks, journal=args.journal, incremental=args.incremental, force=args.force,
+                                low_memory=args.low_memory)
+            failed = pipeline.run(symbols)
+        else:
+            failed = run_batch(symbols, workers=args.workers, report=print_report, cache_dir=args.cache_dir,
+                               replay=args.replay, hooks=hooks, journal=args.journal, incremental=args.incremental,
+                               force=args.force, low_memory=args.low_memory)
+        print("{} done, {} failed".format(len(symbols) - len(failed), len(failed)))
+    elif args.company_name:
+        from models.batch import open_cache
+        from models.to_sql import ToSQL
+
+        app = ToSQL(args.company_name, cache=open_cache(args.cache_dir, args.replay), incremental=args.incremental,
+                    hooks=hooks, force=args.force, low_memory=args.low_memory)
+        app.build()
+    elif not args.export:
+        parser.error("either company_name, --batch or --export is required")
+
+    if args.export:
+        from models.export import export_parquet
+
+        for path in export_parquet(args.export):
+            print("Wrote {}".format(path))
+
+    if args.batch and failed:
+        sys.exit(1)
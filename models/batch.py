@@ -0,0 +1,111 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, TextIO, Tuple
+from multiprocessing import Pool
+import os
+import sys
+
+from models.cache import ResponseCache
+from models.changes import PageFingerprints
+from models.dimensions import DimensionCache
+from models.directory import SymbolDirectory
+from models.journal import RunJournal
+from models.metrics import Hook, publish
+from models.peers import PeerGroups
+from models.scheduler import RequestScheduler
+from models.tables import get_engine, session
+
+# One database session, response cache, label cache, peer table cache, symbol directory, page fingerprints,
+# request scheduler and run journal connection per worker process, opened by the pool initializer
+_db_session: Any = None
+_cache: Optional[ResponseCache] = None
+_dimensions: Optional[DimensionCache] = None
+_peer_groups: Optional[PeerGroups] = None
+_directory: Optional[SymbolDirectory] = None
+_fingerprints: Optional[PageFingerprints] = None
+_scheduler: Optional[RequestScheduler] = None
+_journal: Optional[RunJournal] = None
+_options: Dict[str, Any] = {}
+
+
+def read_symbols(path: str) -> List[str]:
+    stream: TextIO = sys.stdin if path == "-" else open(path)
+    try:
+        symbols: List[str] = []
+        for line in stream:
+            symbol: str = line.split("#")[0].strip()
+            if symbol and symbol not in symbols:
+                symbols.append(symbol)
+        return symbols
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def open_cache(cache_dir: Optional[str] = None, replay: bool = False) -> Optional[ResponseCache]:
+    if cache_dir is None and not replay:
+        return None
+    return ResponseCache(directory=cache_dir, replay=replay)
+
+
+def _init_worker(cache_dir: Optional[str], replay: bool, share: float, journal: Optional[str],
+                 options: Dict[str, Any]) -> None:
+    global _db_session, _cache, _dimensions, _peer_groups, _directory, _fingerprints, _scheduler, _journal, _options
+    # Connections inherited from the parent process must not be shared with the children
+    get_engine().dispose()
+    _db_session = session()
+    _cache = open_cache(cache_dir, replay)
+    _dimensions = DimensionCache(get_engine(), _db_session)
+    _peer_groups = PeerGroups()
+    _directory = SymbolDirectory(get_engine(), _db_session)
+    _fingerprints = PageFingerprints(get_engine(), _db_session)
+    # The configured rates are for the whole run, each worker gets its share of them
+    _scheduler = RequestScheduler(share=share)
+    _journal = RunJournal(journal) if journal else None
+    _options = options
+
+
+def _scrape(symbol: str) -> Tuple[str, bool, str, Dict[str, Any]]:
+    from models.to_sql import ToSQL
+
+    try:
+        app: Any = ToSQL(symbol, db_session=_db_session, cache=_cache, dimensions=_dimensions,
+                         peer_groups=_peer_groups, directory=_directory, fingerprints=_fingerprints,
+                         scheduler=_scheduler, journal=_journal, **_options)
+        app.build()
+    except Exception as e:
+        _db_session.rollback()
+        error: str = "{}: {}".format(type(e).__name__, e)
+        if _journal is not None:
+            _journal.fail(symbol, error)
+        return symbol, False, error, {}
+    # Hooks run in the parent, so file and HTTP exporters see the whole run
+    return symbol, True, "", app.metrics.snapshot()
+
+
+def run_batch(symbols: Iterable[str], workers: Optional[int] = None,
+              report: Callable[[str, bool, str], None] = None, cache_dir: Optional[str] = None,
+              replay: bool = False, hooks: Optional[List[Hook]] = None, journal: Optional[str] = None,
+              **options: Any) -> List[str]:
+    # With a journal, companies finished by an earlier run of it are skipped
+    if journal:
+        recorded: RunJournal = RunJournal(journal)
+        symbols = recorded.pending(symbols)
+        recorded.close()
+    failed: List[str] = []
+    workers = workers or os.cpu_count() or 1
+    with Pool(processes=workers, initializer=_init_worker,
+              initargs=(cache_dir, replay, 1.0 / workers, journal, options)) as pool:
+        for symbol, ok, error, snapshot in pool.imap_unordered(_scrape, symbols):
+            if not ok:
+                failed.append(symbol)
+            else:
+                publish(hooks, symbol, snapshot)
+            if report:
+                report(symbol, ok, error)
+    return failed
+
+
+def print_report(symbol: str, ok: bool, error: str) -> None:
+    if ok:
+        print("OK      {}".format(symbol), flush=True)
+    else:
+        print("FAILED  {}  {}".format(symbol, error), flush=True)
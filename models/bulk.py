@@ -0,0 +1,49 @@
+from typing import Any, Dict, List
+import io
+import math
+
+from config import CONFIG
+
+
+def _copy_value(value: Any) -> str:
+    # PostgreSQL COPY text format
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def supports_copy(bind: Any) -> bool:
+    return bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2"
+
+
+def copy_rows(db_session: Any, table: Any, rows: List[Dict]) -> None:
+    # Streams the rows through COPY ... FROM STDIN on the session's own connection and transaction
+    columns: List[str] = list(rows[0].keys())
+    preparer: Any = db_session.get_bind().dialect.identifier_preparer
+    statement: str = "COPY {} ({}) FROM STDIN".format(
+        preparer.format_table(table.__table__), ", ".join(preparer.quote(column) for column in columns))
+
+    buffer: io.StringIO = io.StringIO()
+    for row in rows:
+        buffer.write("\t".join(_copy_value(row[column]) for column in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+
+    cursor: Any = db_session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(statement, buffer)
+    finally:
+        cursor.close()
+
+
+def bulk_insert(db_session: Any, table: Any, rows: List[Dict]) -> None:
+    if not rows:
+        return
+    if supports_copy(db_session.get_bind()):
+        copy_rows(db_session, table, rows)
+        return
+    # One executemany per chunk instead of one INSERT per ORM object
+    for start in range(0, len(rows), CONFIG.BULK_CHUNK_SIZE):
+        db_session.execute(table.__table__.insert(), rows[start:start + CONFIG.BULK_CHUNK_SIZE])
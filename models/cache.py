@@ -0,0 +1,94 @@
+from typing import Dict, List, Optional, Tuple
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+from config import CONFIG
+
+
+class CacheMiss(Exception):
+    pass
+
+
+class ResponseCache(object):
+    def __init__(self, directory: Optional[str] = None, ttls: Optional[Dict[str, int]] = None,
+                 max_bytes: Optional[int] = None, replay: bool = False) -> None:
+        self.directory: str = directory or CONFIG.CACHE_DIR
+        self.ttls: Dict[str, int] = dict(CONFIG.CACHE_TTL)
+        self.ttls.update(ttls or {})
+        self.max_bytes: int = max_bytes or CONFIG.CACHE_MAX_BYTES
+        self.replay: bool = replay
+        self.size: Optional[int] = None
+        self.lock: threading.Lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(url: str, consolidated: bool = False) -> str:
+        return hashlib.sha1("{}|{}".format(url, int(consolidated)).encode("utf-8")).hexdigest()
+
+    def get(self, endpoint: str, url: str, consolidated: bool = False) -> Optional[bytes]:
+        path: str = self.__path(self.key(url, consolidated))
+        try:
+            age: float = time.time() - os.stat(path).st_mtime
+            if not self.replay and age > self.ttls.get(endpoint, 0):
+                return None
+            with gzip.open(path, "rb") as f:
+                return f.read()
+        except (OSError, EOFError):
+            if self.replay:
+                raise CacheMiss(url)
+            return None
+
+    def put(self, endpoint: str, url: str, content: bytes, consolidated: bool = False) -> None:
+        if self.replay or self.ttls.get(endpoint, 0) <= 0:
+            return
+
+        path: str = self.__path(self.key(url, consolidated))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write aside and rename, so concurrent readers never see a truncated entry
+        tmp: str = "{}.{}.{}.tmp".format(path, os.getpid(), threading.get_ident())
+        with gzip.open(tmp, "wb", compresslevel=6) as f:
+            f.write(content)
+        os.replace(tmp, path)
+
+        with self.lock:
+            if self.size is None:
+                self.size = sum(size for _, size, _ in self.__entries())
+            else:
+                self.size += os.path.getsize(path)
+            if self.size > self.max_bytes:
+                self.__evict()
+
+    def __path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ".gz")
+
+    def __entries(self) -> List[Tuple[float, int, str]]:
+        entries: List[Tuple[float, int, str]] = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".gz"):
+                    continue
+                path: str = os.path.join(root, name)
+                try:
+                    st: os.stat_result = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def __evict(self) -> None:
+        # Drop the oldest entries until the cache is back under 90% of its budget
+        entries: List[Tuple[float, int, str]] = sorted(self.__entries())
+        size: int = sum(entry[1] for entry in entries)
+        target: int = int(self.max_bytes * 0.9)
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= entry_size
+        self.size = size
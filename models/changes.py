@@ -0,0 +1,63 @@
+from typing import Any, Dict, List, Optional
+import hashlib
+import threading
+
+from lxml import etree
+from sqlalchemy import select
+
+from models.page_index import PageIndex
+from models.tables import CompanyInfo, connect, get_engine
+
+# Stored per company and page, "page_" for the main page and "consolidated_" for the consolidated one
+FINGERPRINT_FIELDS: List[str] = ["hash", "etag", "last_modified"]
+FINGERPRINT_COLUMNS: List[str] = ["{}_{}".format(prefix, field)
+                                  for prefix in ("page", "consolidated") for field in FINGERPRINT_FIELDS]
+
+
+def page_fingerprint(page: PageIndex) -> str:
+    # Digest of the statement tables only: the top ratios and the CAGR ranges move with the share price
+    # every trading day, the statements only when results, schedules or shareholding are published
+    digest: Any = hashlib.sha1()
+    for table in page.table_buttons:
+        if table.get("class") != "ranges-table":
+            digest.update(etree.tostring(table))
+    return digest.hexdigest()
+
+
+def validators(response: Any) -> Dict[str, Optional[str]]:
+    headers: Any = getattr(response, "headers", None) or {}
+    return {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+
+
+class PageFingerprints(object):
+    # Symbol -> fingerprints of its stored pages, read from the database once and kept in memory like the
+    # symbol directory, so fetchers can compare pages without a database round trip
+    def __init__(self, bind: Any = None, db_session: Any = None) -> None:
+        self.bind: Any = bind if bind is not None else get_engine()
+        self.db_session: Any = db_session
+        self.entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self.lock: threading.Lock = threading.Lock()
+
+    def preload(self) -> None:
+        with self.lock:
+            if self.entries is None:
+                self.entries = {}
+                columns: List[Any] = [getattr(CompanyInfo, column) for column in FINGERPRINT_COLUMNS]
+                # A company listed on BSE only has no NSE symbol to be looked up by
+                query: Any = select(CompanyInfo.nse, *columns).where(
+                    CompanyInfo.page_hash.isnot(None), CompanyInfo.nse.isnot(None)).order_by(CompanyInfo.id)
+                with connect(self.bind, self.db_session) as conn:
+                    rows: List[Any] = conn.execute(query).fetchall()
+                for row in rows:
+                    # Looked up case-insensitively, "nse" is the symbol as stored for finding the company row
+                    entry: Dict[str, Any] = {
+                        prefix: {field: getattr(row, "{}_{}".format(prefix, field)) for field in FINGERPRINT_FIELDS}
+                        for prefix in ("page", "consolidated")}
+                    entry["nse"] = row.nse
+                    self.entries[row.nse.upper()] = entry
+
+    def lookup(self, symbol: str) -> Optional[Dict[str, Any]]:
+        self.preload()
+        with self.lock:
+            return self.entries.get(symbol.upper())
+
@@ -0,0 +1,54 @@
+from typing import Any, Dict, Optional
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import CONFIG
+
+
+class HttpClient(object):
+    HEADERS: Dict = {
+        "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko)",
+        "accept-encoding": "gzip, deflate",
+    }
+
+    _shared: Any = None
+    _shared_lock: Any = threading.Lock()
+
+    def __init__(self, timeout: Optional[float] = None, retries: Optional[int] = None,
+                 backoff: Optional[float] = None, pool_size: Optional[int] = None) -> None:
+        self.timeout: float = timeout or CONFIG.HTTP_TIMEOUT
+        retry: Retry = Retry(
+            total=CONFIG.HTTP_RETRIES if retries is None else retries,
+            backoff_factor=CONFIG.HTTP_BACKOFF if backoff is None else backoff,
+            # 429s are left to RequestScheduler, which pauses every request and not just the throttled one. urllib3
+            # retries any 429 carrying Retry-After whatever the forcelist says, so the header is not honoured here
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=False,
+        )
+        adapter: HTTPAdapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size or CONFIG.HTTP_POOL_SIZE,
+                                           max_retries=retry)
+        self.session: Any = requests.Session()
+        self.session.headers.update(self.HEADERS)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @classmethod
+    def shared(cls) -> "HttpClient":
+        # One client per process, so every company of a run reuses the same connection pool
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def get(self, url: str, **kwargs: Any) -> Any:
+        kwargs.setdefault("timeout", self.timeout)
+        r: Any = self.session.get(url, **kwargs)
+        r.raise_for_status()
+        return r
+
+    def close(self) -> None:
+        self.session.close()
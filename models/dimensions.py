@@ -0,0 +1,58 @@
+from typing import Any, Dict, Iterable, List
+import threading
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from models.tables import connect
+
+
+class DimensionCache(object):
+    # Label -> id maps for the *_months and *_indexes tables, loaded once per table and kept for the whole run
+    def __init__(self, bind: Any, db_session: Any = None) -> None:
+        self.bind: Any = bind
+        self.db_session: Any = db_session
+        self.ids: Dict[Any, Dict[str, int]] = {}
+        self.lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def label_column(table: Any) -> Any:
+        columns: Any = table.__table__.c
+        return columns.month if "month" in columns else columns.name
+
+    def resolve(self, table: Any, labels: Iterable[str]) -> Dict[str, int]:
+        with self.lock:
+            ids: Dict[str, int] = self.ids.get(table)
+            if ids is None:
+                ids = self.ids[table] = self.__load(table)
+
+            missing: List[str] = [label for label in dict.fromkeys(labels) if label not in ids]
+            for _ in range(3):
+                if not missing:
+                    break
+                column: Any = self.label_column(table)
+                try:
+                    with connect(self.bind, self.db_session, begin=True) as conn:
+                        conn.execute(table.__table__.insert(), [{column.key: label} for label in missing])
+                except IntegrityError:
+                    # Another worker inserted some of them first, pick up its rows and retry the rest
+                    pass
+                ids.update(self.__load(table, missing))
+                missing = [label for label in missing if label not in ids]
+
+            if missing:
+                raise RuntimeError("Could not insert labels {} into {}".format(missing, table.__tablename__))
+            return ids
+
+    def __load(self, table: Any, labels: List[str] = None) -> Dict[str, int]:
+        column: Any = self.label_column(table)
+        query: Any = select(table.id, column).order_by(table.id)
+        if labels is not None:
+            query = query.where(column.in_(labels))
+
+        ids: Dict[str, int] = {}
+        with connect(self.bind, self.db_session) as conn:
+            for row_id, label in conn.execute(query):
+                ids.setdefault(label, row_id)
+        return ids
+
@@ -0,0 +1,161 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import argparse
+import json
+import threading
+
+from sqlalchemy import bindparam, select
+from sqlalchemy.exc import IntegrityError
+
+from config import CONFIG
+from models.tables import SymbolEntry, connect, get_engine
+
+
+def slug(url: str) -> str:
+    # "/company/RELIANCE/consolidated/" -> "RELIANCE"
+    parts: List[str] = [part for part in (url or "").split("/") if part]
+    return parts[1] if len(parts) > 1 and parts[0] == "company" else ""
+
+
+def pick(results: List[Dict], symbol: str) -> Dict:
+    # The search is fuzzy, only a result whose URL is the symbol's own page is taken: the NSE symbol, or the BSE
+    # code of a company listed on BSE only. A BSE code of a company also listed on NSE leads to the page of its NSE
+    # symbol, it is taken when it is the only company found
+    companies: List[Dict] = [result for result in results if slug(result.get("url", ""))]
+    for result in companies:
+        if slug(result["url"]).upper() == symbol.upper():
+            return result
+    if symbol.isdigit() and len(companies) == 1:
+        return companies[0]
+    raise LookupError("No screener.in company with the symbol {}".format(symbol))
+
+
+class SymbolDirectory(object):
+    # Symbol -> screener ids, read from the database once and kept in memory, new symbols are added by ToSQL
+    # as they are resolved and refresh() re-resolves many at once
+    def __init__(self, bind: Any = None, db_session: Any = None) -> None:
+        self.bind: Any = bind if bind is not None else get_engine()
+        self.db_session: Any = db_session
+        self.entries: Optional[Dict[str, Dict]] = None
+        self.lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def details(screener_id: Any, name: Optional[str], url: Optional[str], warehouse_id: Any = None) -> Dict:
+        # In the shape of a search API result, plus the warehouse id ToSQL reads from the page
+        details: Dict = {"id": int(screener_id), "name": name, "url": url}
+        if warehouse_id is not None and str(warehouse_id).isdigit():
+            details["warehouse-id"] = str(warehouse_id)
+        return details
+
+    def preload(self) -> None:
+        with self.lock:
+            if self.entries is None:
+                self.entries = {}
+                query: Any = select(SymbolEntry.symbol, SymbolEntry.screener_id, SymbolEntry.warehouse_id,
+                                    SymbolEntry.slug, SymbolEntry.name)
+                with connect(self.bind, self.db_session) as conn:
+                    rows: List[Any] = conn.execute(query).fetchall()
+                for row in rows:
+                    self.entries[row.symbol] = self.details(row.screener_id, row.name, row.slug, row.warehouse_id)
+
+    def lookup(self, symbol: str) -> Optional[Dict]:
+        self.preload()
+        with self.lock:
+            details: Optional[Dict] = self.entries.get(symbol.upper())
+        return dict(details) if details is not None else None
+
+    def store(self, db_session: Any, symbol: str, details: Dict) -> None:
+        # Inside the caller's transaction, a no-op when nothing changed
+        key: str = symbol.upper()
+        details = self.details(details["id"], details.get("name"), details.get("url"), details.get("warehouse-id"))
+        self.preload()
+        with self.lock:
+            if self.entries.get(key) == details:
+                return
+        values: Dict[str, Any] = self.__row(key, details)
+        try:
+            with db_session.begin_nested():
+                table: Any = SymbolEntry.__table__
+                if not db_session.execute(table.update().where(table.c.symbol == key).values(values)).rowcount:
+                    db_session.execute(table.insert().values(values))
+        except IntegrityError:
+            # Another worker stored the symbol first
+            pass
+        with self.lock:
+            self.entries[key] = details
+
+    def refresh(self, symbols: Optional[Sequence[str]] = None, client: Any = None,
+                workers: Optional[int] = None) -> List[str]:
+        # Resolves the symbols (every stored one by default) again through the search API and writes them in one
+        # transaction, returns the symbols without an exact match
+        from models.client import HttpClient
+        from models.scheduler import RequestScheduler
+        from models.to_sql import ToSQL
+
+        client = client if client is not None else HttpClient.shared()
+        scheduler: RequestScheduler = RequestScheduler.shared()
+        self.preload()
+        symbols = [s.upper() for s in symbols] if symbols is not None else list(self.entries)
+
+        def search(symbol: str) -> Tuple[str, Optional[Dict]]:
+            url: str = ToSQL.URLS["search_company"].format(symbol)
+            results: List[Dict] = json.loads(scheduler.request("search_company", lambda: client.get(url)).content)
+            try:
+                return symbol, pick(results, symbol)
+            except LookupError:
+                return symbol, None
+
+        with ThreadPoolExecutor(max_workers=workers or CONFIG.MAX_WORKERS) as pool:
+            found: Dict[str, Optional[Dict]] = dict(pool.map(search, dict.fromkeys(symbols)))
+        resolved: Dict[str, Dict] = {symbol: details for symbol, details in found.items() if details is not None}
+
+        table: Any = SymbolEntry.__table__
+        with self.bind.begin() as conn:
+            keys: List[str] = list(resolved)
+            stored: set = set()
+            for start in range(0, len(keys), 1000):
+                stored.update(conn.execute(select(table.c.symbol).where(
+                    table.c.symbol.in_(keys[start:start + 1000]))).scalars())
+            # The warehouse id is not part of the search results, the stored one is kept
+            updates: List[Dict] = [{"new_" + column: value for column, value in self.__row(symbol, details).items()}
+                                   for symbol, details in resolved.items() if symbol in stored]
+            inserts: List[Dict] = [self.__row(symbol, details) for symbol, details in resolved.items()
+                                   if symbol not in stored]
+            if updates:
+                conn.execute(table.update().where(table.c.symbol == bindparam("new_symbol")).values(
+                    screener_id=bindparam("new_screener_id"), slug=bindparam("new_slug"),
+                    name=bindparam("new_name"), updated_at=bindparam("new_updated_at")), updates)
+            if inserts:
+                conn.execute(table.insert(), inserts)
+
+        with self.lock:
+            for symbol, details in resolved.items():
+                self.entries[symbol] = self.details(details["id"], details.get("name"), details.get("url"),
+                                                    self.entries.get(symbol, {}).get("warehouse-id"))
+        return [symbol for symbol, details in found.items() if details is None]
+
+    @staticmethod
+    def __row(symbol: str, details: Dict) -> Dict[str, Any]:
+        warehouse_id: Optional[str] = details.get("warehouse-id")
+        return {
+            "symbol": symbol,
+            "screener_id": int(details["id"]),
+            "warehouse_id": int(warehouse_id) if warehouse_id and str(warehouse_id).isdigit() else None,
+            "slug": details.get("url"),
+            "name": details.get("name"),
+            "updated_at": datetime.utcnow(),
+        }
+
+
+if __name__ == "__main__":
+    from models.batch import read_symbols
+
+    parser = argparse.ArgumentParser(description="Resolve symbols through the search API into the symbol directory.")
+    parser.add_argument("file", nargs="?", help="File with one symbol per line, - for stdin, every stored symbol "
+                                                "when omitted")
+    args = parser.parse_args()
+
+    missing: List[str] = SymbolDirectory().refresh(read_symbols(args.file) if args.file else None)
+    for symbol in missing:
+        print("NOT FOUND  {}".format(symbol))
@@ -0,0 +1,64 @@
+from typing import Any, Dict, List, Optional
+import os
+
+import pandas as pd
+from sqlalchemy import or_, select
+
+from models.read import statement_query
+from models.tables import STATEMENTS, CompanyInfo, PeerComparison, get_engine
+
+
+def export_parquet(directory: str, bind: Any = None, chunk_size: int = 100000) -> List[str]:
+    # Writes one long table per statement under statements/, partitioned hive-style as
+    # statement=<name>/consolidated=<flag>, next to flat company_info and peers snapshots
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    bind = bind if bind is not None else get_engine()
+    schema: Any = pa.schema([
+        ("nse", pa.string()),
+        ("bse", pa.int64()),
+        ("index", pa.string()),
+        ("period", pa.string()),
+        ("value", pa.float64()),
+        ("unit", pa.string()),
+        ("raw", pa.string()),
+    ])
+    written: List[str] = []
+
+    with bind.connect() as conn:
+        for name in STATEMENTS:
+            for consolidated in (False, True):
+                path: str = os.path.join(directory, "statements", "statement={}".format(name),
+                                         "consolidated={}".format(str(consolidated).lower()), "part-0.parquet")
+                writer: Optional[Any] = None
+                result: Any = conn.execution_options(stream_results=True).execute(
+                    statement_query(name, consolidated))
+                while True:
+                    rows: List[Any] = result.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    columns: Dict[str, List] = {field.name: [row[i] for row in rows] for i, field in enumerate(schema)}
+                    if writer is None:
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        writer = pq.ParquetWriter(path, schema, compression="snappy")
+                    writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+                if writer is not None:
+                    writer.close()
+                    written.append(path)
+
+        os.makedirs(directory, exist_ok=True)
+        snapshots: Dict[str, Any] = {
+            "company_info": select(CompanyInfo.__table__),
+            "peers": select(CompanyInfo.nse, PeerComparison.__table__).join(
+                CompanyInfo, or_(PeerComparison.company == CompanyInfo.id,
+                                 PeerComparison.group_id == CompanyInfo.peer_group_id)),
+        }
+        for name, query in snapshots.items():
+            result: Any = conn.execute(query)
+            frame: pd.DataFrame = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+            path: str = os.path.join(directory, "{}.parquet".format(name))
+            pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), path)
+            written.append(path)
+
+    return written
@@ -0,0 +1,50 @@
+from typing import Any, List, NamedTuple, Tuple
+import re
+
+import numpy as np
+
+from models.normalize import normalize
+
+# Same whitespace folding pd.read_html applies to cell text
+_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+
+
+class Table(NamedTuple):
+    index: List[str]
+    columns: List[str]
+    values: np.ndarray
+    units: np.ndarray
+    text: np.ndarray
+
+
+def clean_text(el: Any) -> str:
+    return _WHITESPACE.sub(" ", el.text_content().strip())
+
+
+def extract_rows(table: Any) -> Tuple[List[str], List[List[str]]]:
+    # Walks the <table> once in document order, rows spliced inside other rows by the schedule expansion included
+    header: List[str] = []
+    rows: List[List[str]] = []
+    for tr in table.iter("tr"):
+        cells: List[Any] = [cell for cell in tr if cell.tag in ("td", "th")]
+        if not cells:
+            continue
+        in_head: bool = tr.getparent().tag == "thead"
+        if not rows and not header and (in_head or all(cell.tag == "th" for cell in cells)):
+            header = [clean_text(cell) for cell in cells]
+        elif not in_head:
+            rows.append([clean_text(cell) for cell in cells])
+    return header, rows
+
+
+def extract_table(table: Any) -> Table:
+    header, rows = extract_rows(table)
+    columns: List[str] = header[1:]
+    text: np.ndarray = np.full((len(rows), len(columns)), "", dtype=object)
+    index: List[str] = []
+    for i, row in enumerate(rows):
+        index.append(row[0].replace("+", ""))
+        cells: List[str] = row[1:len(columns) + 1]
+        text[i, :len(cells)] = cells
+    values, units = normalize(text)
+    return Table(index, columns, values, units, text)
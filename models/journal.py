@@ -0,0 +1,71 @@
+from typing import Iterable, List, Optional
+import sqlite3
+import threading
+import time
+import zlib
+
+# Stages a company goes through, in order, "failed" instead of "done" when it did not make it
+STAGES: List[str] = ["started", "fetched", "parsed", "done"]
+
+
+class RunJournal(object):
+    # Progress of a batch run in a local SQLite file, kept apart from the target database so it survives
+    # rollbacks and restarts. Every response is recorded as it arrives, a company restarted after an interruption
+    # reads back what it had fetched and only downloads the rest; finished companies are skipped and their
+    # responses dropped. Worker processes open the same file, each with its own connection
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.lock: threading.Lock = threading.Lock()
+        self.conn: sqlite3.Connection = sqlite3.connect(path, timeout=60, check_same_thread=False,
+                                                        isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS companies (symbol TEXT PRIMARY KEY, stage TEXT NOT NULL, "
+                          "attempts INTEGER NOT NULL DEFAULT 0, error TEXT, updated_at REAL NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS responses (symbol TEXT NOT NULL, url TEXT NOT NULL, "
+                          "content BLOB NOT NULL, PRIMARY KEY (symbol, url))")
+
+    def pending(self, symbols: Iterable[str]) -> List[str]:
+        # The symbols still to scrape, in their order
+        with self.lock:
+            done: set = {row[0] for row in self.conn.execute("SELECT symbol FROM companies WHERE stage = 'done'")}
+        return [symbol for symbol in symbols if symbol.upper() not in done]
+
+    def stage(self, symbol: str, stage: str) -> None:
+        attempt: int = 1 if stage == "started" else 0
+        with self.lock:
+            self.conn.execute("INSERT INTO companies (symbol, stage, attempts, updated_at) VALUES (?, ?, ?, ?) "
+                              "ON CONFLICT (symbol) DO UPDATE SET stage = excluded.stage, error = NULL, "
+                              "attempts = attempts + excluded.attempts, updated_at = excluded.updated_at",
+                              (symbol.upper(), stage, attempt, time.time()))
+
+    def finish(self, symbol: str) -> None:
+        # Called once the company is committed to the target database
+        with self.lock:
+            self.conn.execute("BEGIN")
+            self.conn.execute("UPDATE companies SET stage = 'done', error = NULL, updated_at = ? WHERE symbol = ?",
+                              (time.time(), symbol.upper()))
+            self.conn.execute("DELETE FROM responses WHERE symbol = ?", (symbol.upper(),))
+            self.conn.execute("COMMIT")
+
+    def fail(self, symbol: str, error: str) -> None:
+        # Recorded responses are kept for the next attempt
+        with self.lock:
+            self.conn.execute("INSERT INTO companies (symbol, stage, error, updated_at) VALUES (?, 'failed', ?, ?) "
+                              "ON CONFLICT (symbol) DO UPDATE SET stage = 'failed', error = excluded.error, "
+                              "updated_at = excluded.updated_at", (symbol.upper(), error, time.time()))
+
+    def response(self, symbol: str, url: str) -> Optional[bytes]:
+        with self.lock:
+            row: Optional[tuple] = self.conn.execute("SELECT content FROM responses WHERE symbol = ? AND url = ?",
+                                                     (symbol.upper(), url)).fetchone()
+        return zlib.decompress(row[0]) if row is not None else None
+
+    def record(self, symbol: str, url: str, content: bytes) -> None:
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO responses (symbol, url, content) VALUES (?, ?, ?)",
+                              (symbol.upper(), url, zlib.compress(content)))
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
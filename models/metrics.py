@@ -0,0 +1,188 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import event
+
+# Receives the company symbol and Metrics.snapshot() once the company is written
+Hook = Callable[[str, Dict[str, Any]], None]
+
+
+class Metrics(object):
+    # Stage timings, counters and gauges for one company, fetch threads update it concurrently
+    def __init__(self) -> None:
+        self.stages: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.lock: threading.Lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        start: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed: float = time.perf_counter() - start
+            with self.lock:
+                calls_seconds: List[float] = self.stages.setdefault(stage, [0, 0.0])
+                calls_seconds[0] += 1
+                calls_seconds[1] += elapsed
+
+    def count(self, counter: str, n: int = 1) -> None:
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def gauge(self, name: str, value: float) -> None:
+        with self.lock:
+            self.gauges[name] = value
+
+    @contextmanager
+    def statements(self, db_session: Any) -> Iterator[None]:
+        # Counts what goes through the session's connections only, other companies may share the engine. A commit
+        # inside (the chunks of a low-memory write) begins on a new connection, which is followed as well
+        connections: List[Any] = []
+
+        def before_cursor_execute(*args: Any) -> None:
+            self.count("sql_statements")
+
+        def after_begin(session: Any, transaction: Any, connection: Any) -> None:
+            if not any(connection is followed for followed in connections):
+                connections.append(connection)
+                event.listen(connection, "before_cursor_execute", before_cursor_execute)
+
+        after_begin(db_session, None, db_session.connection())
+        event.listen(db_session, "after_begin", after_begin)
+        try:
+            yield
+        finally:
+            event.remove(db_session, "after_begin", after_begin)
+            for connection in connections:
+                event.remove(connection, "before_cursor_execute", before_cursor_execute)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "stages": {stage: {"calls": int(calls), "seconds": seconds}
+                           for stage, (calls, seconds) in self.stages.items()},
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+            }
+
+
+def timed(stage: str) -> Callable:
+    # For ToSQL methods, times the call into self.metrics under the given stage
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            with self.metrics.timer(stage):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def publish(hooks: Optional[List[Hook]], symbol: str, snapshot: Dict[str, Any]) -> None:
+    for hook in hooks or []:
+        hook(symbol, snapshot)
+
+
+class LogHook(object):
+    def __init__(self, logger: Optional[logging.Logger] = None) -> None:
+        self.logger: logging.Logger = logger or logging.getLogger("screener.metrics")
+
+    def __call__(self, symbol: str, snapshot: Dict[str, Any]) -> None:
+        stages: str = " ".join("{}={:.3f}s".format(stage, row["seconds"]) for stage, row in snapshot["stages"].items())
+        counters: str = " ".join("{}={}".format(counter, n) for counter, n in snapshot["counters"].items())
+        gauges: str = " ".join("{}={:g}".format(name, value) for name, value in snapshot.get("gauges", {}).items())
+        self.logger.info("%s %s %s %s", symbol, stages, counters, gauges)
+
+
+class JsonHook(object):
+    # One JSON object per line and company
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.lock: threading.Lock = threading.Lock()
+
+    def __call__(self, symbol: str, snapshot: Dict[str, Any]) -> None:
+        line: str = json.dumps(dict(snapshot, symbol=symbol, time=time.time()))
+        with self.lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+class PrometheusHook(object):
+    # Totals over the run in the Prometheus text format, rewritten after every company (for the node exporter
+    # textfile collector) and optionally served over HTTP. Gauges are the latest company's
+    PREFIX: str = "screener"
+
+    def __init__(self, path: Optional[str] = None, port: Optional[int] = None) -> None:
+        self.path: Optional[str] = path
+        self.companies: int = 0
+        self.stages: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.lock: threading.Lock = threading.Lock()
+        self.server: Optional[ThreadingHTTPServer] = self.serve(port) if port else None
+
+    def __call__(self, symbol: str, snapshot: Dict[str, Any]) -> None:
+        with self.lock:
+            self.companies += 1
+            for stage, row in snapshot["stages"].items():
+                calls_seconds: List[float] = self.stages.setdefault(stage, [0, 0.0])
+                calls_seconds[0] += row["calls"]
+                calls_seconds[1] += row["seconds"]
+            for counter, n in snapshot["counters"].items():
+                self.counters[counter] = self.counters.get(counter, 0) + n
+            self.gauges.update(snapshot.get("gauges", {}))
+            text: str = self.__render()
+
+        if self.path:
+            with open(self.path + ".tmp", "w") as f:
+                f.write(text)
+            os.replace(self.path + ".tmp", self.path)
+
+    def render(self) -> str:
+        with self.lock:
+            return self.__render()
+
+    def __render(self) -> str:
+        lines: List[str] = [
+            "# TYPE {}_companies_total counter".format(self.PREFIX),
+            "{}_companies_total {}".format(self.PREFIX, self.companies),
+            "# TYPE {}_stage_seconds_total counter".format(self.PREFIX),
+        ]
+        lines += ['{}_stage_seconds_total{{stage="{}"}} {:.6f}'.format(self.PREFIX, stage, seconds)
+                  for stage, (_, seconds) in sorted(self.stages.items())]
+        lines.append("# TYPE {}_stage_calls_total counter".format(self.PREFIX))
+        lines += ['{}_stage_calls_total{{stage="{}"}} {}'.format(self.PREFIX, stage, int(calls))
+                  for stage, (calls, _) in sorted(self.stages.items())]
+        for counter, n in sorted(self.counters.items()):
+            lines.append("# TYPE {}_{}_total counter".format(self.PREFIX, counter))
+            lines.append("{}_{}_total {}".format(self.PREFIX, counter, n))
+        for name, value in sorted(self.gauges.items()):
+            lines.append("# TYPE {}_{} gauge".format(self.PREFIX, name))
+            lines.append("{}_{} {:g}".format(self.PREFIX, name, value))
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int) -> ThreadingHTTPServer:
+        hook: PrometheusHook = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                body: bytes = hook.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        server: ThreadingHTTPServer = ThreadingHTTPServer(("", port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
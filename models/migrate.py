@@ -0,0 +1,100 @@
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+
+from sqlalchemy import bindparam, func, inspect, select, String, text
+
+from models.tables import STATEMENTS, Base, get_engine
+
+
+def migrate(bind: Optional[Any] = None, log: Callable[[str], None] = print) -> None:
+    # Brings a database created by an older version up to the current models, in one transaction
+    bind = bind if bind is not None else get_engine()
+    Base.metadata.create_all(bind)
+    inspector: Any = inspect(bind)
+    with bind.begin() as conn:
+        _add_columns(conn, inspector, log)
+        _dedupe_labels(conn, log)
+        _bound_columns(conn, inspector, log)
+        _create_indexes(conn, inspector, log)
+
+
+def _add_columns(conn: Any, inspector: Any, log: Callable[[str], None]) -> None:
+    quote: Callable[[str], str] = conn.dialect.identifier_preparer.quote
+    for table in Base.metadata.sorted_tables:
+        existing: List[str] = [column["name"] for column in inspector.get_columns(table.name)]
+        for column in table.columns:
+            if column.name not in existing:
+                conn.execute(text("ALTER TABLE {} ADD {} {}".format(
+                    quote(table.name), quote(column.name), column.type.compile(dialect=conn.dialect))))
+                log("Added {}.{}".format(table.name, column.name))
+
+
+def _dedupe_labels(conn: Any, log: Callable[[str], None]) -> None:
+    # Cells pointing at a duplicated label are moved to its oldest row before the others are deleted
+    for _, cell, indexes, months in STATEMENTS.values():
+        for labels, foreign_key in ((indexes, cell.index_id), (months, cell.month_id)):
+            label: Any = labels.__table__.c.month if "month" in labels.__table__.c else labels.__table__.c.name
+            keep: Dict[str, int] = {}
+            moves: List[Dict[str, int]] = []
+            for row_id, value in conn.execute(select(labels.id, label).order_by(labels.id)):
+                if value in keep:
+                    moves.append({"duplicate": row_id, "kept": keep[value]})
+                else:
+                    keep[value] = row_id
+            if not moves:
+                continue
+
+            conn.execute(cell.__table__.update().where(foreign_key == bindparam("duplicate")).values(
+                {foreign_key.key: bindparam("kept")}), moves)
+            duplicates: List[int] = [move["duplicate"] for move in moves]
+            for start in range(0, len(duplicates), 1000):
+                conn.execute(labels.__table__.delete().where(labels.id.in_(duplicates[start:start + 1000])))
+            log("Merged {} duplicate labels in {}".format(len(moves), labels.__tablename__))
+
+
+def _bound_columns(conn: Any, inspector: Any, log: Callable[[str], None]) -> None:
+    dialect: str = conn.dialect.name
+    if dialect == "sqlite":
+        # SQLite does not enforce lengths, nothing to alter
+        return
+
+    quote: Callable[[str], str] = conn.dialect.identifier_preparer.quote
+    for table in Base.metadata.sorted_tables:
+        stored: Dict[str, Dict] = {column["name"]: column for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if not isinstance(column.type, String) or column.type.length is None:
+                continue
+            length: Optional[int] = getattr(stored[column.name]["type"], "length", None)
+            if length is not None and length <= column.type.length:
+                continue
+
+            longest: Optional[int] = conn.execute(select(func.max(func.length(column)))).scalar()
+            if longest is not None and longest > column.type.length:
+                raise ValueError("{}.{} holds values of {} characters, longer than the new limit of {}".format(
+                    table.name, column.name, longest, column.type.length))
+
+            column_type: str = column.type.compile(dialect=conn.dialect)
+            if dialect == "mssql":
+                null: str = "NULL" if stored[column.name]["nullable"] else "NOT NULL"
+                statement: str = "ALTER TABLE {} ALTER COLUMN {} {} {}".format(
+                    quote(table.name), quote(column.name), column_type, null)
+            else:
+                statement: str = "ALTER TABLE {} ALTER COLUMN {} TYPE {}".format(
+                    quote(table.name), quote(column.name), column_type)
+            conn.execute(text(statement))
+            log("Bounded {}.{} to {}".format(table.name, column.name, column_type))
+
+
+def _create_indexes(conn: Any, inspector: Any, log: Callable[[str], None]) -> None:
+    for table in Base.metadata.sorted_tables:
+        existing: List[str] = [index["name"] for index in inspector.get_indexes(table.name)]
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(conn)
+                log("Created index {}".format(index.name))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upgrade an existing database to the current schema.")
+    parser.parse_args()
+    migrate()
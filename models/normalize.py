@@ -0,0 +1,30 @@
+from typing import Any, Optional, Tuple
+import math
+
+import numpy as np
+
+# A signed number with Indian or western digit grouping, e.g. "-1,234.5" or "5,00,000"
+_NUMBER: str = r"[-+]?\d[\d,]*(?:\.\d+)?"
+_NOT_NUMBER: str = r"[^\d.\-+]"
+
+
+def normalize(texts: Any) -> Tuple[np.ndarray, np.ndarray]:
+    # Parses every raw cell text at once into (float64 values, unit markers) of the same shape,
+    # NaN / None where the text holds no number / no unit
+    import pandas as pd  # deferred, most of a cold start is spent importing it
+
+    texts: np.ndarray = np.asarray(texts, dtype=object)
+    flat: pd.Series = pd.Series(texts.ravel(), dtype=object).fillna("").astype(str)
+
+    numbers: pd.Series = flat.str.extract("({})".format(_NUMBER), expand=False)
+    values: pd.Series = pd.to_numeric(numbers.str.replace(_NOT_NUMBER, "", regex=True), errors="coerce")
+
+    units: pd.Series = flat.str.replace(_NUMBER, " ", regex=True).str.split().str.join(" ")
+    units = units.where(units != "", None)
+
+    return values.to_numpy(dtype=np.float64).reshape(texts.shape), units.to_numpy(dtype=object).reshape(texts.shape)
+
+
+def to_float(value: float) -> Optional[float]:
+    # NaN is stored as NULL
+    return None if math.isnan(value) else float(value)
@@ -0,0 +1,53 @@
+from typing import Any, Dict, List, Optional
+
+
+class PageIndex(object):
+    # Walks a parsed company page once and keeps every node the builders need, so none of them
+    # has to search the whole document again
+    def __init__(self, page: Any) -> None:
+        self.page: Any = page
+        self.elements: Dict[str, Any] = {}
+        self.tables: Dict[str, Any] = {}
+        self.result_tables: Dict[str, Any] = {}
+        self.ranges: List[Any] = []
+        self.table_buttons: Dict[Any, List[Any]] = {}
+        self.has_consolidated: bool = False
+        self.__walk()
+
+    def __walk(self) -> None:
+        for el in self.page.iter():
+            tag: Any = el.tag
+            if not isinstance(tag, str):  # Comments and processing instructions
+                continue
+
+            el_id: Optional[str] = el.get("id")
+            if el_id is not None and el_id not in self.elements:
+                self.elements[el_id] = el
+
+            if tag == "table":
+                self.table_buttons[el] = []
+                if el.get("class") == "ranges-table":
+                    self.ranges.append(el)
+                    continue
+                section: Optional[Any] = next(el.iterancestors("section"), None)
+                if section is None or section.get("id") is None:
+                    continue
+                self.tables.setdefault(section.get("id"), el)
+                if el.getparent().get("data-result-table") is not None:
+                    self.result_tables.setdefault(section.get("id"), el)
+            elif tag == "button" and el.get("onclick") is not None:
+                table: Optional[Any] = next(el.iterancestors("table"), None)
+                if table is not None:
+                    self.table_buttons[table].append(el)
+            elif tag == "a" and "consolidated" in el.get("href", ""):
+                self.has_consolidated = True
+
+    def element(self, el_id: str) -> Any:
+        return self.elements[el_id]
+
+    def table(self, section_id: str) -> Optional[Any]:
+        # The statement table of a section, the one wrapped in a data-result-table div when there is one
+        return self.result_tables.get(section_id, self.tables.get(section_id))
+
+    def buttons(self, table: Any) -> List[Any]:
+        return self.table_buttons.get(table, [])
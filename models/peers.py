@@ -0,0 +1,71 @@
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import hashlib
+import json
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from config import CONFIG
+from models.bulk import bulk_insert
+from models.tables import PeerComparison, PeerGroup
+
+
+def peer_digest(rows: List[Dict]) -> str:
+    return hashlib.sha1(json.dumps(rows, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class PeerGroups(object):
+    # Companies of one industry get the same peer table: it is downloaded once per run and stored once per
+    # distinct content, each company only keeps the id of its snapshot
+    def __init__(self, ttl: Optional[float] = None) -> None:
+        self.ttl: float = CONFIG.CACHE_TTL["peers"] if ttl is None else ttl
+        # industry -> (time fetched, response)
+        self.responses: Dict[str, Tuple[float, bytes]] = {}
+        # industry -> set once the company fetching its peer table is done
+        self.pending: Dict[str, threading.Event] = {}
+        self.lock: threading.Lock = threading.Lock()
+
+    def response(self, industry: str) -> Optional[bytes]:
+        # None tells the caller to fetch the table itself and to hand it to remember() whatever happens,
+        # callers for the same industry meanwhile wait for that fetch instead of repeating it
+        while True:
+            with self.lock:
+                entry: Optional[Tuple[float, bytes]] = self.responses.get(industry)
+                if entry is not None and time.time() - entry[0] <= self.ttl:
+                    return entry[1]
+                fetching: Optional[threading.Event] = self.pending.get(industry)
+                if fetching is None:
+                    self.pending[industry] = threading.Event()
+                    return None
+            fetching.wait()
+
+    def remember(self, industry: str, content: Optional[bytes]) -> None:
+        # content is None when the fetch failed, the next caller then tries again
+        with self.lock:
+            if content is not None:
+                self.responses[industry] = (time.time(), content)
+            fetching: Optional[threading.Event] = self.pending.pop(industry, None)
+        if fetching is not None:
+            fetching.set()
+
+    def store(self, db_session: Any, industry: str, rows: List[Dict]) -> Tuple[int, bool]:
+        # Returns the snapshot id and whether its rows were inserted now, inside the caller's transaction
+        digest: str = peer_digest(rows)
+        query: Any = select(PeerGroup.id).where(PeerGroup.industry == industry, PeerGroup.digest == digest)
+        group_id: Optional[int] = db_session.execute(query).scalar()
+        if group_id is not None:
+            return group_id, False
+
+        try:
+            with db_session.begin_nested():
+                group: PeerGroup = PeerGroup(industry=industry, digest=digest, fetched_at=datetime.utcnow())
+                db_session.add(group)
+                db_session.flush([group])
+                bulk_insert(db_session, PeerComparison, [dict(row, group_id=group.id) for row in rows])
+        except IntegrityError:
+            # Another worker stored the same snapshot first
+            return db_session.execute(query).scalar_one(), False
+        return group.id, True
@@ -0,0 +1,161 @@
+from typing import Any, Callable, Iterable, List, Optional
+from queue import Empty, Queue
+import threading
+
+from config import CONFIG
+from models.cache import ResponseCache
+from models.changes import PageFingerprints
+from models.dimensions import DimensionCache
+from models.directory import SymbolDirectory
+from models.journal import RunJournal
+from models.metrics import Hook, publish
+from models.peers import PeerGroups
+from models.tables import session
+
+# Marks the end of a queue, one per consumer thread
+_DONE: Any = object()
+
+
+class Pipeline(object):
+    # fetchers -> parse_queue -> parsers -> write_queue -> one writer, the bounded queues keep a fast
+    # stage from running ahead of a slow one while the three stages overlap
+    def __init__(self, fetchers: Optional[int] = None, parsers: Optional[int] = None,
+                 queue_size: Optional[int] = None, write_batch: Optional[int] = None, db_session: Any = None,
+                 cache: Optional[ResponseCache] = None, report: Callable[[str, bool, str], None] = None,
+                 hooks: Optional[List[Hook]] = None, journal: Optional[str] = None, **options: Any) -> None:
+        self.fetchers: int = fetchers or CONFIG.PIPELINE_FETCHERS
+        self.parsers: int = parsers or CONFIG.PIPELINE_PARSERS
+        self.write_batch: int = write_batch or CONFIG.PIPELINE_WRITE_BATCH
+        self.db_session: Any = db_session if db_session is not None else session()
+        self.dimensions: DimensionCache = DimensionCache(self.db_session.get_bind(), self.db_session)
+        self.peer_groups: PeerGroups = PeerGroups()
+        self.directory: SymbolDirectory = SymbolDirectory(self.db_session.get_bind(), self.db_session)
+        self.fingerprints: PageFingerprints = PageFingerprints(self.db_session.get_bind(), self.db_session)
+        self.cache: Optional[ResponseCache] = cache
+        self.journal: Optional[RunJournal] = RunJournal(journal) if journal else None
+        self.report: Optional[Callable[[str, bool, str], None]] = report
+        self.hooks: Optional[List[Hook]] = hooks
+        self.options: dict = options
+        size: int = queue_size or CONFIG.PIPELINE_QUEUE_SIZE
+        self.fetch_queue: Queue = Queue(maxsize=size)
+        self.parse_queue: Queue = Queue(maxsize=size)
+        self.write_queue: Queue = Queue(maxsize=size)
+        self.failed: List[str] = []
+        self.lock: threading.Lock = threading.Lock()
+
+    def run(self, symbols: Iterable[str]) -> List[str]:
+        # Loaded before the threads start, afterwards the fetchers only read them from memory
+        self.directory.preload()
+        self.fingerprints.preload()
+        if self.journal is not None:
+            # Companies finished by an earlier run of the journal are skipped
+            symbols = self.journal.pending(symbols)
+        fetchers: List[threading.Thread] = [threading.Thread(target=self.__fetch, daemon=True)
+                                            for _ in range(self.fetchers)]
+        parsers: List[threading.Thread] = [threading.Thread(target=self.__parse, daemon=True)
+                                           for _ in range(self.parsers)]
+        writer: threading.Thread = threading.Thread(target=self.__write, daemon=True)
+        for thread in fetchers + parsers + [writer]:
+            thread.start()
+
+        for symbol in symbols:
+            self.fetch_queue.put(symbol)
+        for _ in fetchers:
+            self.fetch_queue.put(_DONE)
+
+        for thread in fetchers:
+            thread.join()
+        for _ in parsers:
+            self.parse_queue.put(_DONE)
+        for thread in parsers:
+            thread.join()
+        self.write_queue.put(_DONE)
+        writer.join()
+        return self.failed
+
+    def __done(self, symbol: str, ok: bool, error: str = "") -> None:
+        with self.lock:
+            if not ok:
+                self.failed.append(symbol)
+                if self.journal is not None:
+                    self.journal.fail(symbol, error)
+            if self.report:
+                self.report(symbol, ok, error)
+
+    def __journal(self, symbol: str, stage: str) -> None:
+        if self.journal is not None:
+            self.journal.stage(symbol, stage)
+
+    def __fetch(self) -> None:
+        from models.to_sql import ToSQL
+
+        while True:
+            symbol: Any = self.fetch_queue.get()
+            if symbol is _DONE:
+                return
+            try:
+                self.__journal(symbol, "started")
+                app: Any = ToSQL(symbol, db_session=self.db_session, cache=self.cache, dimensions=self.dimensions,
+                                 peer_groups=self.peer_groups, directory=self.directory,
+                                 fingerprints=self.fingerprints, journal=self.journal, **self.options)
+                app.fetch()
+                self.__journal(symbol, "fetched")
+            except Exception as e:
+                self.__done(symbol, False, "{}: {}".format(type(e).__name__, e))
+                continue
+            self.parse_queue.put(app)
+
+    def __parse(self) -> None:
+        while True:
+            app: Any = self.parse_queue.get()
+            if app is _DONE:
+                return
+            try:
+                app.parse()
+                self.__journal(app.comp_name, "parsed")
+            except Exception as e:
+                self.__done(app.comp_name, False, "{}: {}".format(type(e).__name__, e))
+                continue
+            self.write_queue.put(app)
+
+    def __write(self) -> None:
+        # Companies of one batch share a transaction, each in its own savepoint so a failing one is dropped alone
+        pending: List[Any] = []
+        finished: bool = False
+        while not finished:
+            try:
+                app: Any = self.write_queue.get(timeout=CONFIG.PIPELINE_WRITE_WAIT if pending else None)
+            except Empty:
+                app = None
+
+            if app is _DONE:
+                finished = True
+            elif app is not None:
+                try:
+                    with self.db_session.begin_nested():
+                        app.write()
+                except Exception as e:
+                    self.__done(app.comp_name, False, "{}: {}".format(type(e).__name__, e))
+                else:
+                    pending.append(app)
+
+            if pending and (finished or app is None or len(pending) >= self.write_batch):
+                self.__commit(pending)
+                pending = []
+
+    def __commit(self, apps: List[Any]) -> None:
+        try:
+            self.db_session.commit()
+        except Exception as e:
+            self.db_session.rollback()
+            for app in apps:
+                self.__done(app.comp_name, False, "{}: {}".format(type(e).__name__, e))
+            return
+        for app in apps:
+            if self.journal is not None:
+                self.journal.finish(app.comp_name)
+            publish(self.hooks, app.comp_name, app.metrics.snapshot())
+            self.__done(app.comp_name, True)
+        if self.options.get("low_memory"):
+            # Nothing of the committed companies is needed any more
+            self.db_session.expunge_all()
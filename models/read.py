@@ -0,0 +1,94 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from models.tables import STATEMENTS, CompanyInfo, get_engine
+
+
+def statement_query(name: str, consolidated: bool, symbols: Optional[List[str]] = None) -> Any:
+    # One row per stored cell with its company, row label and period, in insertion order per company
+    statement, cell, indexes, months = STATEMENTS[name]
+    query: Any = select(
+        CompanyInfo.nse,
+        CompanyInfo.bse,
+        indexes.name.label("index"),
+        months.month.label("period"),
+        cell.value_num.label("value"),
+        cell.unit,
+        cell.value.label("raw"),
+    ).select_from(cell).join(
+        statement, cell.table_id == statement.id
+    ).join(
+        CompanyInfo, statement.company == CompanyInfo.id
+    ).join(
+        indexes, cell.index_id == indexes.id
+    ).join(
+        months, cell.month_id == months.id
+    ).where(
+        statement.consolidated == consolidated
+    ).order_by(CompanyInfo.nse, cell.id)
+    if symbols is not None:
+        query = query.where(CompanyInfo.nse.in_(symbols))
+    return query
+
+
+def pivot(rows: List[Any], raw: bool = False) -> pd.DataFrame:
+    # (index, period, value) rows -> index x period frame, labels keep the order they were scraped in. A label
+    # repeated within the statement (the same investor under two shareholder categories) gives one row per
+    # occurrence, the n-th cell of a label and period goes to its n-th row
+    index: np.ndarray = np.array([row[0] for row in rows], dtype=object)
+    period: np.ndarray = np.array([row[1] for row in rows], dtype=object)
+    index_codes, index_labels = pd.factorize(index)
+    period_codes, period_labels = pd.factorize(period)
+    cells: np.ndarray = index_codes * len(period_labels) + period_codes
+    order: np.ndarray = np.argsort(cells, kind="stable")
+    repeated: np.ndarray = cells[order][1:] == cells[order][:-1]
+    if repeated.any():
+        # Position of each cell within the run of its (label, period) in sorted order
+        starts: np.ndarray = np.flatnonzero(np.concatenate(([True], ~repeated)))
+        occurrence: np.ndarray = np.empty(len(cells), dtype=np.int64)
+        occurrence[order] = np.arange(len(cells)) - np.repeat(starts, np.diff(np.append(starts, len(cells))))
+        index_codes, keys = pd.factorize(index_codes * (occurrence.max() + 1) + occurrence)
+        index_labels = index_labels[keys // (occurrence.max() + 1)]
+
+    if raw:
+        values: np.ndarray = np.full((len(index_labels), len(period_labels)), None, dtype=object)
+        values[index_codes, period_codes] = [row[2] for row in rows]
+    else:
+        values: np.ndarray = np.full((len(index_labels), len(period_labels)), np.nan)
+        values[index_codes, period_codes] = np.array([row[2] for row in rows], dtype=np.float64)
+    return pd.DataFrame(values, index=pd.Index(index_labels, name="index"),
+                        columns=pd.Index(period_labels, name="period"))
+
+
+def load_statements(symbols: Iterable[str], statement: str, consolidated: bool = False, bind: Any = None,
+                    raw: bool = False) -> Dict[str, pd.DataFrame]:
+    # Companies are fetched with one query per 1000 symbols, the bound parameter limit of SQL Server is 2100
+    bind = bind if bind is not None else get_engine()
+    symbols: List[str] = list(dict.fromkeys(symbols))
+    frames: Dict[str, pd.DataFrame] = {}
+    with bind.connect() as conn:
+        for start in range(0, len(symbols), 1000):
+            query: Any = statement_query(statement, consolidated, symbols[start:start + 1000])
+            current: Optional[str] = None
+            rows: List[Any] = []
+            for nse, _, index, period, value, _, text in conn.execute(query):
+                if nse != current:
+                    if rows:
+                        frames[current] = pivot(rows, raw)
+                    current, rows = nse, []
+                rows.append((index, period, text if raw else value))
+            if rows:
+                frames[current] = pivot(rows, raw)
+    return frames
+
+
+def load_statement(nse: str, statement: str, consolidated: bool = False, bind: Any = None,
+                   raw: bool = False) -> pd.DataFrame:
+    # Numeric values by default, raw=True gives the scraped text; empty when nothing is stored
+    frames: Dict[str, pd.DataFrame] = load_statements([nse], statement, consolidated, bind, raw)
+    if nse not in frames:
+        return pd.DataFrame(index=pd.Index([], name="index"), columns=pd.Index([], name="period"))
+    return frames[nse]
@@ -0,0 +1,174 @@
+from typing import Any, Callable, Deque, Dict, Optional
+from collections import deque
+from email.utils import parsedate_to_datetime
+import math
+import threading
+import time
+
+from config import CONFIG
+
+
+def retry_after(response: Any) -> float:
+    # Seconds or an HTTP date, the configured pause when the header is missing or unreadable
+    value: Optional[str] = response.headers.get("Retry-After") if response is not None else None
+    if value:
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            try:
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+            except (TypeError, ValueError):
+                pass
+    return CONFIG.RATE_RETRY_AFTER
+
+
+class TokenBucket(object):
+    # Not thread-safe on its own, RequestScheduler holds its lock around every call. An infinite rate never waits
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate: float = rate
+        self.burst: float = burst
+        self.tokens: float = burst
+        self.updated: float = time.monotonic()
+
+    def wait(self, now: float) -> float:
+        # Seconds until a token is available, 0 when one is
+        if math.isinf(self.rate):
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+
+class RequestScheduler(object):
+    # Every HTTP call of ToSQL goes through one of these: a global token bucket and one per endpoint bound the
+    # request rate, a concurrency limit bounds the requests in flight. Both are halved when the server throttles
+    # or fails (at most once per DECREASE_INTERVAL) and grow back additively while it answers, a 429 also pauses
+    # every request for its Retry-After before it is retried
+    DECREASE_INTERVAL: float = 1.0
+    # Window of the observed request rate, in seconds
+    WINDOW: float = 10.0
+
+    _shared: Any = None
+    _shared_lock: Any = threading.Lock()
+
+    def __init__(self, rate: Optional[float] = None, limits: Optional[Dict[str, float]] = None,
+                 share: float = 1.0) -> None:
+        # share scales every rate down for one of several processes scraping at once
+        self.base_rate: float = (rate or CONFIG.RATE_LIMIT) * share
+        limits = limits if limits is not None else CONFIG.RATE_LIMITS
+        self.base_limits: Dict[str, float] = {endpoint: limit * share for endpoint, limit in limits.items()}
+        self.bucket: TokenBucket = TokenBucket(self.base_rate, CONFIG.RATE_BURST)
+        self.buckets: Dict[str, TokenBucket] = {endpoint: TokenBucket(limit, CONFIG.RATE_BURST)
+                                                for endpoint, limit in self.base_limits.items()}
+        # Fraction of the configured rates currently allowed
+        self.factor: float = 1.0
+        self.limit: float = float(CONFIG.CONCURRENCY_START)
+        self.in_flight: int = 0
+        self.queued: int = 0
+        self.throttled: int = 0
+        self.failed: int = 0
+        self.paused_until: float = 0.0
+        self.decreased_at: float = 0.0
+        self.completed: Deque[float] = deque()
+        self.condition: threading.Condition = threading.Condition()
+
+    @classmethod
+    def shared(cls) -> "RequestScheduler":
+        # One scheduler per process, like HttpClient.shared()
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def request(self, endpoint: str, call: Callable[[], Any], metrics: Any = None) -> Any:
+        attempt: int = 0
+        while True:
+            self.__acquire(endpoint)
+            try:
+                response: Any = call()
+            except Exception as e:
+                # requests' HTTPError carries the response, connection errors and timeouts do not
+                failed: Any = getattr(e, "response", None)
+                status: Optional[int] = failed.status_code if failed is not None else None
+                if status == 429 and attempt < CONFIG.RATE_RETRIES:
+                    self.__release(throttled=True, pause=retry_after(failed))
+                    if metrics is not None:
+                        metrics.count("http_throttled")
+                    attempt += 1
+                    continue
+                self.__release(failed=status is None or status == 429 or status >= 500)
+                raise
+            self.__release()
+            return response
+
+    def stats(self) -> Dict[str, float]:
+        with self.condition:
+            now: float = time.monotonic()
+            self.__trim(now)
+            stats: Dict[str, float] = {
+                "rate": self.bucket.rate,
+                "observed_rate": len(self.completed) / self.WINDOW,
+                "concurrency": int(self.limit),
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "throttled": self.throttled,
+                "failed": self.failed,
+                "paused_seconds": max(self.paused_until - now, 0.0),
+            }
+            for endpoint, bucket in self.buckets.items():
+                stats["rate_" + endpoint] = bucket.rate
+            return stats
+
+    def __acquire(self, endpoint: str) -> None:
+        bucket: Optional[TokenBucket] = self.buckets.get(endpoint)
+        with self.condition:
+            self.queued += 1
+            try:
+                while True:
+                    now: float = time.monotonic()
+                    wait: Optional[float] = max(self.paused_until - now, 0.0)
+                    if not wait:
+                        # None waits for a request to finish
+                        wait = None if self.in_flight >= int(self.limit) else max(
+                            self.bucket.wait(now), bucket.wait(now) if bucket is not None else 0.0)
+                    if wait == 0:
+                        self.bucket.take()
+                        if bucket is not None:
+                            bucket.take()
+                        self.in_flight += 1
+                        return
+                    self.condition.wait(wait)
+            finally:
+                self.queued -= 1
+
+    def __release(self, throttled: bool = False, failed: bool = False, pause: float = 0.0) -> None:
+        with self.condition:
+            now: float = time.monotonic()
+            self.in_flight -= 1
+            if throttled or failed:
+                self.throttled += throttled
+                self.failed += failed
+                self.paused_until = max(self.paused_until, now + pause)
+                if now - self.decreased_at >= self.DECREASE_INTERVAL:
+                    self.decreased_at = now
+                    self.limit = max(float(CONFIG.CONCURRENCY_MIN), self.limit / 2)
+                    self.__scale(max(CONFIG.RATE_MIN_FACTOR, self.factor / 2))
+            else:
+                self.completed.append(now)
+                self.__trim(now)
+                self.limit = min(float(CONFIG.CONCURRENCY_MAX), self.limit + 1 / self.limit)
+                self.__scale(min(1.0, self.factor + CONFIG.RATE_RECOVERY))
+            self.condition.notify_all()
+
+    def __scale(self, factor: float) -> None:
+        self.factor = factor
+        self.bucket.rate = self.base_rate * factor
+        for endpoint, bucket in self.buckets.items():
+            bucket.rate = self.base_limits[endpoint] * factor
+
+    def __trim(self, now: float) -> None:
+        while self.completed and now - self.completed[0] > self.WINDOW:
+            self.completed.popleft()
@@ -0,0 +1,167 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import threading
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Float, select
+
+from models.tables import STATEMENTS, CompanyInfo, get_engine
+
+# Annual statements screened by default, quarterly results and shareholding have other period axes
+SCREEN_STATEMENTS: Tuple[str, ...] = ("ratios", "profit_loss", "balance_sheet")
+
+_universes: Dict[Tuple, "Universe"] = {}
+_universes_lock: threading.Lock = threading.Lock()
+
+
+def metric_key(label: str) -> str:
+    # Stored labels keep the &nbsp; of their expand button, e.g. "Sales\xa0"
+    return " ".join(str(label).replace("\xa0", " ").split())
+
+
+class Universe(object):
+    # Every company's annual statements as dense company x metric x year arrays, NaN where nothing is stored.
+    # Years are fiscal years taken from the period label ("Mar 2021" -> 2021), TTM columns are left out
+    def __init__(self, companies: np.ndarray, fields: Dict[str, np.ndarray], values: Dict[str, np.ndarray],
+                 metrics: Dict[str, List[str]], years: Dict[str, np.ndarray]) -> None:
+        self.companies: np.ndarray = companies
+        self.fields: Dict[str, np.ndarray] = fields
+        self.values: Dict[str, np.ndarray] = values
+        self.metrics: Dict[str, Dict[str, int]] = {
+            statement: {label: i for i, label in enumerate(labels)} for statement, labels in metrics.items()}
+        self.years: Dict[str, np.ndarray] = years
+        # Position of each company's most recent year per statement, -1 when it has none
+        self.latest: Dict[str, np.ndarray] = {statement: self.__latest(array) for statement, array in values.items()}
+
+    @classmethod
+    def load(cls, bind: Any = None, statements: Sequence[str] = SCREEN_STATEMENTS,
+             consolidated: Optional[bool] = None, refresh: bool = False) -> "Universe":
+        # Cached per database and selection until refresh=True. consolidated=None takes a company's
+        # consolidated statement where it has one and its standalone statement otherwise
+        bind = bind if bind is not None else get_engine()
+        key: Tuple = (str(bind.url), tuple(statements), consolidated)
+        with _universes_lock:
+            if refresh or key not in _universes:
+                _universes[key] = cls.__read(bind, statements, consolidated)
+            return _universes[key]
+
+    @classmethod
+    def __read(cls, bind: Any, statements: Sequence[str], consolidated: Optional[bool]) -> "Universe":
+        numeric: List[Any] = [c for c in CompanyInfo.__table__.columns if isinstance(c.type, Float)]
+        with bind.connect() as conn:
+            info: pd.DataFrame = pd.DataFrame(
+                conn.execute(select(CompanyInfo.id, CompanyInfo.nse, *numeric)).fetchall(),
+                columns=["id", "nse"] + [c.name for c in numeric])
+            # Sized on every company, the ones without an NSE symbol still have cells
+            size: int = int(info["id"].max()) + 1 if len(info) else 1
+            info = info.dropna(subset=["nse"]).drop_duplicates("nse", keep="last").sort_values("nse")
+            companies: np.ndarray = info["nse"].to_numpy(dtype=str)
+            fields: Dict[str, np.ndarray] = {c.name: info[c.name].to_numpy(dtype=np.float64) for c in numeric}
+            # company id -> row of the arrays, -1 for ids not kept above
+            positions: np.ndarray = np.full(size, -1)
+            positions[info["id"].to_numpy(dtype=np.int64)] = np.arange(len(info))
+
+            values: Dict[str, np.ndarray] = {}
+            metrics: Dict[str, List[str]] = {}
+            years: Dict[str, np.ndarray] = {}
+            for statement in statements:
+                values[statement], metrics[statement], years[statement] = cls.__dense(
+                    conn, statement, consolidated, positions)
+        return cls(companies, fields, values, metrics, years)
+
+    @staticmethod
+    def __dense(conn: Any, statement: str, consolidated: Optional[bool],
+                positions: np.ndarray) -> Tuple[np.ndarray, List[str], np.ndarray]:
+        # Cells are read as plain ids and numbers, labels and periods are resolved on their small tables
+        parent, cell, indexes, months = STATEMENTS[statement]
+        index_ids, index_labels = zip(*conn.execute(select(indexes.id, indexes.name)).fetchall() or [(0, "")])
+        month_ids, month_labels = zip(*conn.execute(select(months.id, months.month)).fetchall() or [(0, "")])
+
+        metric_codes, metric_labels = pd.factorize(pd.Series([metric_key(label) for label in index_labels]))
+        index_position: np.ndarray = np.full(max(index_ids) + 1, -1)
+        index_position[list(index_ids)] = metric_codes
+
+        month_years: pd.Series = pd.to_numeric(
+            pd.Series(month_labels, dtype=object).str.extract(r"(\d{4})\s*$", expand=False), errors="coerce")
+        years: np.ndarray = np.unique(month_years.dropna().to_numpy(dtype=np.int64))
+        month_position: np.ndarray = np.full(max(month_ids) + 1, -1)
+        month_position[list(month_ids)] = np.where(
+            month_years.isna(), -1, np.searchsorted(years, month_years.fillna(0).to_numpy(dtype=np.int64)))
+
+        query: Any = select(parent.company, parent.consolidated, cell.index_id, cell.month_id, cell.value_num).join(
+            parent, cell.table_id == parent.id)
+        if consolidated is not None:
+            query = query.where(parent.consolidated == consolidated)
+        # Rows are unpacked to tuples first, numpy would probe each Row for the array interface
+        rows: np.ndarray = np.array([tuple(row) for row in conn.execute(query)], dtype=np.float64).reshape(-1, 5)
+        rows = rows[~np.isnan(rows[:, :4]).any(axis=1)]
+        # Ids past the positions (companies added since they were read) are not kept
+        company_ids: np.ndarray = rows[:, 0].astype(np.int64)
+        inside: np.ndarray = (company_ids >= 0) & (company_ids < len(positions))
+        company: np.ndarray = np.where(inside, positions[np.where(inside, company_ids, 0)], -1)
+        metric: np.ndarray = index_position[rows[:, 2].astype(np.int64)]
+        year: np.ndarray = month_position[rows[:, 3].astype(np.int64)]
+
+        keep: np.ndarray = (company >= 0) & (metric >= 0) & (year >= 0)
+        if consolidated is None:
+            # A company with any consolidated cell of this statement is read from those only
+            is_consolidated: np.ndarray = rows[:, 1] == 1
+            has_consolidated: np.ndarray = np.zeros(len(positions), dtype=bool)
+            has_consolidated[company[keep & is_consolidated]] = True
+            keep &= is_consolidated | ~has_consolidated[company]
+
+        array: np.ndarray = np.full((int(positions.max()) + 1, len(metric_labels), len(years)), np.nan)
+        array[company[keep], metric[keep], year[keep]] = rows[keep, 4]
+        return array, list(metric_labels), years
+
+    @staticmethod
+    def __latest(array: np.ndarray) -> np.ndarray:
+        present: np.ndarray = ~np.isnan(array).all(axis=1)
+        last: np.ndarray = present.shape[1] - 1 - np.argmax(present[:, ::-1], axis=1)
+        return np.where(present.any(axis=1), last, -1)
+
+    def get(self, statement: str, metric: str) -> np.ndarray:
+        # company x year, aligned on self.years[statement]
+        return self.values[statement][:, self.metrics[statement][metric_key(metric)], :]
+
+    def last(self, statement: str, metric: str, n: int = 1) -> np.ndarray:
+        # company x n, each company's own n most recent years, oldest first
+        latest: np.ndarray = self.latest[statement]
+        columns: np.ndarray = latest[:, None] - np.arange(n - 1, -1, -1)[None, :]
+        series: np.ndarray = self.get(statement, metric)
+        taken: np.ndarray = np.take_along_axis(series, np.clip(columns, 0, None), axis=1)
+        return np.where((columns >= 0) & (latest[:, None] >= 0), taken, np.nan)
+
+    def field(self, name: str) -> np.ndarray:
+        # CompanyInfo numeric column, e.g. "market_cap_num" or "roce_num"
+        return self.fields[name]
+
+    def select(self, mask: np.ndarray) -> List[str]:
+        # A company passes when every year of a company x year condition holds, NaN compares as False
+        mask = np.asarray(mask, dtype=bool)
+        if mask.ndim > 1:
+            mask = mask.all(axis=tuple(range(1, mask.ndim)))
+        return self.companies[mask].tolist()
+
+    def save(self, path: str) -> None:
+        arrays: Dict[str, np.ndarray] = {"companies": self.companies}
+        for name, array in self.fields.items():
+            arrays["field:" + name] = array
+        for statement, array in self.values.items():
+            arrays["values:" + statement] = array
+            arrays["metrics:" + statement] = np.array(list(self.metrics[statement]), dtype=str)
+            arrays["years:" + statement] = self.years[statement]
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def open(cls, path: str) -> "Universe":
+        with np.load(path) as data:
+            arrays: Dict[str, np.ndarray] = {name: data[name] for name in data.files}
+        prefixed: Dict[str, Dict[str, np.ndarray]] = {"field": {}, "values": {}, "metrics": {}, "years": {}}
+        for name, array in arrays.items():
+            if ":" in name:
+                prefix, key = name.split(":", 1)
+                prefixed[prefix][key] = array
+        return cls(arrays["companies"], prefixed["field"], prefixed["values"],
+                   {statement: labels.tolist() for statement, labels in prefixed["metrics"].items()},
+                   prefixed["years"])
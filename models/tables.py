@@ -1,40 +1,118 @@
+from typing import Any, Iterator, Optional
+from contextlib import contextmanager
+import threading
+
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, Float, Boolean
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Float, Boolean, Index, DateTime
 from sqlalchemy.orm import relationship, sessionmaker
 from sqlalchemy import create_engine
+from sqlalchemy.engine.url import make_url
 
 from config import CONFIG
 
-engine = create_engine("mssql+pyodbc://{}:{}@{}:{}/{}?driver={}".format(
-    CONFIG.USER,
-    CONFIG.PASSWORD,
-    CONFIG.HOST,
-    CONFIG.PORT,
-    CONFIG.DB_NAME,
-    CONFIG.DRIVER
-))
+
+def database_url() -> str:
+    if CONFIG.DATABASE_URL:
+        return CONFIG.DATABASE_URL
+    return "mssql+pyodbc://{}:{}@{}:{}/{}?driver={}".format(
+        CONFIG.USER,
+        CONFIG.PASSWORD,
+        CONFIG.HOST,
+        CONFIG.PORT,
+        CONFIG.DB_NAME,
+        CONFIG.DRIVER
+    )
+
+
+# Created on first use, so importing the models does not load a database driver
+_engine: Optional[Any] = None
+_session_factory: Optional[sessionmaker] = None
+_engine_lock: threading.Lock = threading.Lock()
+
+
+def get_engine() -> Any:
+    global _engine, _session_factory
+    with _engine_lock:
+        if _engine is None:
+            url: Any = make_url(database_url())
+            _engine = create_engine(url, **({"fast_executemany": True} if url.drivername == "mssql+pyodbc" else {}))
+            _session_factory = sessionmaker(bind=_engine)
+        return _engine
+
+
+def session(**kwargs: Any) -> Any:
+    get_engine()
+    return _session_factory(**kwargs)
+
+
+@contextmanager
+def connect(bind: Any, db_session: Any = None, begin: bool = False) -> Iterator[Any]:
+    # SQLite allows a single writer, so there the reads and writes of the shared caches go through the session's
+    # own connection and transaction, elsewhere through a connection of their own
+    if db_session is not None and bind.dialect.name == "sqlite":
+        yield db_session.connection()
+    elif begin:
+        with bind.begin() as conn:
+            yield conn
+    else:
+        with bind.connect() as conn:
+            yield conn
+
+
+def __getattr__(name: str) -> Any:
+    # Keeps `from models.tables import engine` working
+    if name == "engine":
+        return get_engine()
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+# Bounded so the columns can be indexed, unbounded strings are NVARCHAR(max) on SQL Server
+SYMBOL_LENGTH = 32
+LABEL_LENGTH = 255
+VALUE_LENGTH = 64
+UNIT_LENGTH = 32
 
 Base = declarative_base()
-session = sessionmaker(bind=engine)
 
 
 class CompanyInfo(Base):
     __tablename__ = "company_info"
+    __table_args__ = (Index("ix_company_info_nse", "nse"),)
     id = Column(Integer, primary_key=True)
-    name = Column(String)
-    website = Column(String)
+    name = Column(String(LABEL_LENGTH))
+    website = Column(String(LABEL_LENGTH))
     bse = Column(Integer)
-    nse = Column(String)
+    nse = Column(String(SYMBOL_LENGTH))
     about = Column(Text)
-    market_cap = Column(String)
-    current_price = Column(String)
-    high_low = Column(String)
-    stock_p_e = Column(String)
-    book_value = Column(String)
-    dividend_yield = Column(String)
-    roce = Column(String)
-    roe = Column(String)
-    face_value = Column(String)
+    market_cap = Column(String(VALUE_LENGTH))
+    current_price = Column(String(VALUE_LENGTH))
+    high_low = Column(String(VALUE_LENGTH))
+    stock_p_e = Column(String(VALUE_LENGTH))
+    book_value = Column(String(VALUE_LENGTH))
+    dividend_yield = Column(String(VALUE_LENGTH))
+    roce = Column(String(VALUE_LENGTH))
+    roe = Column(String(VALUE_LENGTH))
+    face_value = Column(String(VALUE_LENGTH))
+    # Parsed values of the fields above: ₹ Cr. for market_cap, ₹ for prices and values, % for yields and returns
+    market_cap_num = Column(Float)
+    current_price_num = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    stock_p_e_num = Column(Float)
+    book_value_num = Column(Float)
+    dividend_yield_num = Column(Float)
+    roce_num = Column(Float)
+    roe_num = Column(Float)
+    face_value_num = Column(Float)
+    # Shared snapshot of the peer table, rows stored under the company itself predate peer groups
+    peer_group_id = Column(Integer, ForeignKey("peer_group.id"))
+    # Fingerprints of the scraped main and consolidated pages with the HTTP validators they were served with
+    page_hash = Column(String(40))
+    page_etag = Column(String(LABEL_LENGTH))
+    page_last_modified = Column(String(VALUE_LENGTH))
+    consolidated_hash = Column(String(40))
+    consolidated_etag = Column(String(LABEL_LENGTH))
+    consolidated_last_modified = Column(String(VALUE_LENGTH))
     peer = relationship("PeerComparison", cascade="all, delete")
     quarterly_results = relationship("QuarterlyResults", cascade="all, delete")
     profit_loss = relationship("ProfitLoss", cascade="all, delete")
@@ -103,12 +181,27 @@ class CompanyInfo(Base):
     )
 
 
+class PeerGroup(Base):
+    # One peer table as fetched for an industry, shared by every company whose fetch had the same content
+    __tablename__ = "peer_group"
+    __table_args__ = (Index("ux_peer_group_snapshot", "industry", "digest", unique=True),)
+    id = Column(Integer, primary_key=True)
+    industry = Column(String(LABEL_LENGTH), nullable=False)
+    digest = Column(String(40), nullable=False)
+    fetched_at = Column(DateTime)
+
+
 class PeerComparison(Base):
     __tablename__ = "peer_comparison"
+    __table_args__ = (
+        Index("ix_peer_comparison_company", "company"),
+        Index("ix_peer_comparison_group", "group_id"),
+    )
     id = Column(Integer, primary_key=True)
     company = Column(Integer, ForeignKey("company_info.id"))
+    group_id = Column(Integer, ForeignKey("peer_group.id"))
     s_no = Column(Integer)
-    name = Column(String)
+    name = Column(String(LABEL_LENGTH))
     current_price = Column(Float)
     price_to_earning = Column(Float)
     market_cap = Column(Float)
@@ -123,29 +216,38 @@ class PeerComparison(Base):
 # Quarterly result
 class QuarterlyCell(Base):
     __tablename__ = "quarterly_cell"
+    __table_args__ = (
+        Index("ix_quarterly_cell_table", "table_id", "index_id", "month_id"),
+        Index("ix_quarterly_cell_index", "index_id", "month_id"),
+    )
     id = Column(Integer, primary_key=True)
     index_id = Column(Integer, ForeignKey("quarterly_indexes.id"))
     month_id = Column(Integer, ForeignKey("quarterly_months.id"))
     table_id = Column(Integer, ForeignKey("quarterly_results.id"))
-    value = Column(String)
+    value = Column(String(VALUE_LENGTH))
+    value_num = Column(Float)
+    unit = Column(String(UNIT_LENGTH))
     idx = relationship("QuarterlyIndexes")
     month = relationship("QuarterlyMonths")
 
 
 class QuarterlyIndexes(Base):
     __tablename__ = "quarterly_indexes"
+    __table_args__ = (Index("ux_quarterly_indexes_name", "name", unique=True),)
     id = Column(Integer, primary_key=True)
-    name = Column(String)
+    name = Column(String(LABEL_LENGTH), nullable=False)
 
 
 class QuarterlyMonths(Base):
     __tablename__ = "quarterly_months"
+    __table_args__ = (Index("ux_quarterly_months_month", "month", unique=True),)
     id = Column(Integer, primary_key=True)
-    month = Column(String)
+    month = Column(String(LABEL_LENGTH), nullable=False)
 
 
 class QuarterlyResults(Base):
     __tablename__ = "quarterly_results"
+    __table_args__ = (Index("ix_quarterly_results_company", "company", "consolidated"),)
     id = Column(Integer, primary_key=True)
     company = Column(Integer, ForeignKey("company_info.id"))
     consolidated = Column(Boolean)
@@ -155,29 +257,38 @@ class QuarterlyResults(Base):
 # Profit & Loss
 class ProfitLossCell(Base):
     __tablename__ = "profit_loss_cell"
+    __table_args__ = (
+        Index("ix_profit_loss_cell_table", "table_id", "index_id", "month_id"),
+        Index("ix_profit_loss_cell_index", "index_id", "month_id"),
+    )
     id = Column(Integer, primary_key=True)
     index_id = Column(Integer, ForeignKey("profit_loss_indexes.id"))
     month_id = Column(Integer, ForeignKey("profit_loss_months.id"))
     table_id = Column(Integer, ForeignKey("profit_loss.id"))
-    value = Column(String)
+    value = Column(String(VALUE_LENGTH))
+    value_num = Column(Float)
+    unit = Column(String(UNIT_LENGTH))
     idx = relationship("ProfitLossIndexes")
     month = relationship("ProfitLossMonths")
 
 
 class ProfitLossIndexes(Base):
     __tablename__ = "profit_loss_indexes"
+    __table_args__ = (Index("ux_profit_loss_indexes_name", "name", unique=True),)
     id = Column(Integer, primary_key=True)
-    name = Column(String)
+    name = Column(String(LABEL_LENGTH), nullable=False)
 
 
 class ProfitLossMonths(Base):
     __tablename__ = "profit_loss_months"
+    __table_args__ = (Index("ux_profit_loss_months_month", "month", unique=True),)
     id = Column(Integer, primary_key=True)
-    month = Column(String)
+    month = Column(String(LABEL_LENGTH), nullable=False)
 
 
 class ProfitLoss(Base):
     __tablename__ = "profit_loss"
+    __table_args__ = (Index("ix_profit_loss_company", "company", "consolidated"),)
     id = Column(Integer, primary_key=True)
     company = Column(Integer, ForeignKey("company_info.id"))
     consolidated = Column(Boolean)
@@ -187,29 +298,38 @@ class ProfitLoss(Base):
 # Balance Sheet
 class BalanceSheetCell(Base):
     __tablename__ = "balance_sheet_cell"
+    __table_args__ = (
+        Index("ix_balance_sheet_cell_table", "table_id", "index_id", "month_id"),
+        Index("ix_balance_sheet_cell_index", "index_id", "month_id"),
+    )
     id = Column(Integer, primary_key=True)
     index_id = Column(Integer, ForeignKey("balance_sheet_indexes.id"))
     month_id = Column(Integer, ForeignKey("balance_sheet_months.id"))
     table_id = Column(Integer, ForeignKey("balance_sheet.id"))
-    value = Column(String)
+    value = Column(String(VALUE_LENGTH))
+    value_num = Column(Float)
+    unit = Column(String(UNIT_LENGTH))
     idx = relationship("BalanceSheetIndexes")
     month = relationship("BalanceSheetMonths")
 
 
 class BalanceSheetIndexes(Base):
     __tablename__ = "balance_sheet_indexes"
+    __table_args__ = (Index("ux_balance_sheet_indexes_name", "name", unique=True),)
     id = Column(Integer, primary_key=True)
-    name = Column(String)
+    name = Column(String(LABEL_LENGTH), nullable=False)
 
 
 class BalanceSheetMonths(Base):
     __tablename__ = "balance_sheet_months"
+    __table_args__ = (Index("ux_balance_sheet_months_month", "month", unique=True),)
     id = Column(Integer, primary_key=True)
-    month = Column(String)
+    month = Column(String(LABEL_LENGTH), nullable=False)
 
 
 class BalanceSheet(Base):
     __tablename__ = "balance_sheet"
+    __table_args__ = (Index("ix_balance_sheet_company", "company", "consolidated"),)
     id = Column(Integer, primary_key=True)
     company = Column(Integer, ForeignKey("company_info.id"))
     consolidated = Column(Boolean)
@@ -219,29 +339,38 @@ class BalanceSheet(Base):
 # Cash Flow
 class CashFlowCell(Base):
     __tablename__ = "cash_flow_cell"
+    __table_args__ = (
+        Index("ix_cash_flow_cell_table", "table_id", "index_id", "month_id"),
+        Index("ix_cash_flow_cell_index", "index_id", "month_id"),
+    )
     id = Column(Integer, primary_key=True)
     index_id = Column(Integer, ForeignKey("cash_flow_indexes.id"))
     month_id = Column(Integer, ForeignKey("cash_flow_months.id"))
     table_id = Column(Integer, ForeignKey("cash_flow.id"))
-    value = Column(String)
+    value = Column(String(VALUE_LENGTH))
+    value_num = Column(Float)
+    unit = Column(String(UNIT_LENGTH))
     idx = relationship("CashFlowIndexes")
     month = relationship("CashFlowMonths")
 
 
 class CashFlowIndexes(Base):
     __tablename__ = "cash_flow_indexes"
+    __table_args__ = (Index("ux_cash_flow_indexes_name", "name", unique=True),)
     id = Column(Integer, primary_key=True)
-    name = Column(String)
+    name = Column(String(LABEL_LENGTH), nullable=False)
 
 
 class CashFlowMonths(Base):
     __tablename__ = "cash_flow_months"
+    __table_args__ = (Index("ux_cash_flow_months_month", "month", unique=True),)
     id = Column(Integer, primary_key=True)
-    month = Column(String)
+    month = Column(String(LABEL_LENGTH), nullable=False)
 
 
 class CashFlow(Base):
     __tablename__ = "cash_flow"
+    __table_args__ = (Index("ix_cash_flow_company", "company", "consolidated"),)
     id = Column(Integer, primary_key=True)
     company = Column(Integer, ForeignKey("company_info.id"))
     consolidated = Column(Boolean)
@@ -251,29 +380,38 @@ class CashFlow(Base):
 # Ratios
 class RatiosCell(Base):
     __tablename__ = "ratios_cell"
+    __table_args__ = (
+        Index("ix_ratios_cell_table", "table_id", "index_id", "month_id"),
+        Index("ix_ratios_cell_index", "index_id", "month_id"),
+    )
     id = Column(Integer, primary_key=True)
     index_id = Column(Integer, ForeignKey("ratios_indexes.id"))
     month_id = Column(Integer, ForeignKey("ratios_months.id"))
     table_id = Column(Integer, ForeignKey("ratios.id"))
-    value = Column(String)
+    value = Column(String(VALUE_LENGTH))
+    value_num = Column(Float)
+    unit = Column(String(UNIT_LENGTH))
     idx = relationship("RatiosIndexes")
     month = relationship("RatiosMonths")
 
 
 class RatiosIndexes(Base):
     __tablename__ = "ratios_indexes"
+    __table_args__ = (Index("ux_ratios_indexes_name", "name", unique=True),)
     id = Column(Integer, primary_key=True)
-    name = Column(String)
+    name = Column(String(LABEL_LENGTH), nullable=False)
 
 
 class RatiosMonths(Base):
     __tablename__ = "ratios_months"
+    __table_args__ = (Index("ux_ratios_months_month", "month", unique=True),)
     id = Column(Integer, primary_key=True)
-    month = Column(String)
+    month = Column(String(LABEL_LENGTH), nullable=False)
 
 
 class Ratios(Base):
     __tablename__ = "ratios"
+    __table_args__ = (Index("ix_ratios_company", "company", "consolidated"),)
     id = Column(Integer, primary_key=True)
     company = Column(Integer, ForeignKey("company_info.id"))
     consolidated = Column(Boolean)
@@ -283,29 +421,38 @@ class Ratios(Base):
 # Shareholding
 class ShareholdingCell(Base):
     __tablename__ = "shareholding_cell"
+    __table_args__ = (
+        Index("ix_shareholding_cell_table", "table_id", "index_id", "month_id"),
+        Index("ix_shareholding_cell_index", "index_id", "month_id"),
+    )
     id = Column(Integer, primary_key=True)
     index_id = Column(Integer, ForeignKey("shareholding_indexes.id"))
     month_id = Column(Integer, ForeignKey("shareholding_months.id"))
     table_id = Column(Integer, ForeignKey("shareholding.id"))
-    value = Column(String)
+    value = Column(String(VALUE_LENGTH))
+    value_num = Column(Float)
+    unit = Column(String(UNIT_LENGTH))
     idx = relationship("ShareholdingIndexes")
     month = relationship("ShareholdingMonths")
 
 
 class ShareholdingIndexes(Base):
     __tablename__ = "shareholding_indexes"
+    __table_args__ = (Index("ux_shareholding_indexes_name", "name", unique=True),)
     id = Column(Integer, primary_key=True)
-    name = Column(String)
+    name = Column(String(LABEL_LENGTH), nullable=False)
 
 
 class ShareholdingMonths(Base):
     __tablename__ = "shareholding_months"
+    __table_args__ = (Index("ux_shareholding_months_month", "month", unique=True),)
     id = Column(Integer, primary_key=True)
-    month = Column(String)
+    month = Column(String(LABEL_LENGTH), nullable=False)
 
 
 class Shareholding(Base):
     __tablename__ = "shareholding"
+    __table_args__ = (Index("ix_shareholding_company", "company", "consolidated"),)
     id = Column(Integer, primary_key=True)
     company = Column(Integer, ForeignKey("company_info.id"))
     consolidated = Column(Boolean)
@@ -314,43 +461,91 @@ class Shareholding(Base):
 
 class CompoundedSalesGrowth(Base):
     __tablename__ = "compounded_sales_growth"
+    __table_args__ = (Index("ix_compounded_sales_growth_company", "company", "consolidated"),)
     id = Column(Integer, primary_key=True)
     company = Column(Integer, ForeignKey("company_info.id"))
-    ten_years = Column(String)
-    five_years = Column(String)
-    three_years = Column(String)
-    TTM = Column(String)
+    ten_years = Column(String(VALUE_LENGTH))
+    five_years = Column(String(VALUE_LENGTH))
+    three_years = Column(String(VALUE_LENGTH))
+    TTM = Column(String(VALUE_LENGTH))
+    # Parsed percentages of the fields above
+    ten_years_num = Column(Float)
+    five_years_num = Column(Float)
+    three_years_num = Column(Float)
+    TTM_num = Column(Float)
     consolidated = Column(Boolean)
 
 
 class CompoundedProfitGrowth(Base):
     __tablename__ = "compounded_profit_growth"
+    __table_args__ = (Index("ix_compounded_profit_growth_company", "company", "consolidated"),)
     id = Column(Integer, primary_key=True)
     company = Column(Integer, ForeignKey("company_info.id"))
-    ten_years = Column(String)
-    five_years = Column(String)
-    three_years = Column(String)
-    TTM = Column(String)
+    ten_years = Column(String(VALUE_LENGTH))
+    five_years = Column(String(VALUE_LENGTH))
+    three_years = Column(String(VALUE_LENGTH))
+    TTM = Column(String(VALUE_LENGTH))
+    # Parsed percentages of the fields above
+    ten_years_num = Column(Float)
+    five_years_num = Column(Float)
+    three_years_num = Column(Float)
+    TTM_num = Column(Float)
     consolidated = Column(Boolean)
 
 
 class StockPriceCAGR(Base):
     __tablename__ = "stock_price_cagr"
+    __table_args__ = (Index("ix_stock_price_cagr_company", "company", "consolidated"),)
     id = Column(Integer, primary_key=True)
     company = Column(Integer, ForeignKey("company_info.id"))
-    ten_years = Column(String)
-    five_years = Column(String)
-    three_years = Column(String)
-    one_year = Column(String)
+    ten_years = Column(String(VALUE_LENGTH))
+    five_years = Column(String(VALUE_LENGTH))
+    three_years = Column(String(VALUE_LENGTH))
+    one_year = Column(String(VALUE_LENGTH))
+    # Parsed percentages of the fields above
+    ten_years_num = Column(Float)
+    five_years_num = Column(Float)
+    three_years_num = Column(Float)
+    one_year_num = Column(Float)
     consolidated = Column(Boolean)
 
 
 class ReturnOnQuality(Base):
     __tablename__ = "return_on_quality"
+    __table_args__ = (Index("ix_return_on_quality_company", "company", "consolidated"),)
     id = Column(Integer, primary_key=True)
     company = Column(Integer, ForeignKey("company_info.id"))
-    ten_years = Column(String)
-    five_years = Column(String)
-    three_years = Column(String)
-    last_year = Column(String)
+    ten_years = Column(String(VALUE_LENGTH))
+    five_years = Column(String(VALUE_LENGTH))
+    three_years = Column(String(VALUE_LENGTH))
+    last_year = Column(String(VALUE_LENGTH))
+    # Parsed percentages of the fields above
+    ten_years_num = Column(Float)
+    five_years_num = Column(Float)
+    three_years_num = Column(Float)
+    last_year_num = Column(Float)
     consolidated = Column(Boolean)
+
+
+class SymbolEntry(Base):
+    # Screener ids of a symbol (NSE code or BSE number), filled from the search API and reused across runs
+    __tablename__ = "symbol_directory"
+    __table_args__ = (Index("ux_symbol_directory_symbol", "symbol", unique=True),)
+    id = Column(Integer, primary_key=True)
+    symbol = Column(String(SYMBOL_LENGTH), nullable=False)
+    screener_id = Column(Integer, nullable=False)
+    warehouse_id = Column(Integer)
+    slug = Column(String(LABEL_LENGTH))
+    name = Column(String(LABEL_LENGTH))
+    updated_at = Column(DateTime)
+
+
+# Statement name -> (statement table, cell table, indexes table, months table)
+STATEMENTS = {
+    "quarterly_results": (QuarterlyResults, QuarterlyCell, QuarterlyIndexes, QuarterlyMonths),
+    "profit_loss": (ProfitLoss, ProfitLossCell, ProfitLossIndexes, ProfitLossMonths),
+    "balance_sheet": (BalanceSheet, BalanceSheetCell, BalanceSheetIndexes, BalanceSheetMonths),
+    "cash_flow": (CashFlow, CashFlowCell, CashFlowIndexes, CashFlowMonths),
+    "ratios": (Ratios, RatiosCell, RatiosIndexes, RatiosMonths),
+    "shareholding": (Shareholding, ShareholdingCell, ShareholdingIndexes, ShareholdingMonths),
+}
@@ -1,14 +1,31 @@
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+import json
 
-import requests
-import pandas as pd
+import numpy as np
+from sqlalchemy import bindparam, select
 from lxml import html, etree as ET
+from config import CONFIG
+from models.bulk import bulk_insert
+from models.cache import ResponseCache
+from models.changes import FINGERPRINT_COLUMNS, PageFingerprints, page_fingerprint, validators
+from models.client import HttpClient
+from models.dimensions import DimensionCache
+from models.directory import SymbolDirectory, pick
+from models.extract import Table, extract_rows, extract_table
+from models.journal import RunJournal
+from models.metrics import Hook, Metrics, publish, timed
+from models.normalize import normalize, to_float
+from models.page_index import PageIndex
+from models.scheduler import RequestScheduler
+from models.peers import PeerGroups
 from models.tables import *
 
+# (endpoint, url, consolidated)
+Request = Tuple[str, str, bool]
 
-class ToSQL(object):
-    HEADERS: Dict = {"user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko)"}
 
+class ToSQL(object):
     URLS: Dict = {
         "main": "https://www.screener.in/company/{}/",
         "search_company": "https://www.screener.in/api/company/search/?q={}",
@@ -17,22 +34,124 @@ class ToSQL(object):
         "peers": "https://www.screener.in/api/company/{}/peers/"
     }
 
-    def __init__(self, comp_name: str) -> None:
+    # Per-company relationships rebuilt on every run
+    CHILDREN: List[str] = ["compounded_sales_growth", "compounded_sales_growth_c", "compounded_profit_growth",
+                           "compounded_profit_growth_c", "stock_price_cgar", "stock_price_cgar_c", "return_on_quality",
+                           "return_on_quality_c"]
+
+    # Sections holding expandable rows, the last one only exists on the standalone page
+    SECTIONS: List[str] = ["quarters", "profit-loss", "balance-sheet", "cash-flow", "ratios", "shareholding"]
+
+    def __init__(self, comp_name: str, max_workers: Optional[int] = None, db_session: Any = None,
+                 client: Optional[HttpClient] = None, cache: Optional[ResponseCache] = None,
+                 dimensions: Optional[DimensionCache] = None, incremental: bool = False,
+                 metrics: Optional[Metrics] = None, hooks: Optional[List[Hook]] = None,
+                 peer_groups: Optional[PeerGroups] = None, directory: Optional[SymbolDirectory] = None,
+                 fingerprints: Optional[PageFingerprints] = None, force: bool = False,
+                 scheduler: Optional[RequestScheduler] = None, journal: Optional[RunJournal] = None,
+                 low_memory: bool = False) -> None:
         self.comp_name = comp_name
-        self.details: Dict = self.__get_comp_details(self.comp_name)[0]
-        self.db_session: Any = session()
-        self.exist: Any = self.db_session.query(CompanyInfo).filter(CompanyInfo.nse == self.comp_name).one_or_none()
-
-        if self.exist:
-            self.db_session.delete(self.exist)
-            self.db_session.commit()
-
+        self.metrics: Metrics = metrics if metrics is not None else Metrics()
+        self.hooks: Optional[List[Hook]] = hooks
+        self.client: HttpClient = client if client is not None else HttpClient.shared()
+        self.scheduler: RequestScheduler = scheduler if scheduler is not None else RequestScheduler.shared()
+        self.cache: Optional[ResponseCache] = cache
+        self.journal: Optional[RunJournal] = journal
+        self.max_workers: int = max_workers or CONFIG.MAX_WORKERS
+        self.incremental: bool = incremental
+        # A replay rebuilds the stored data from cached responses, the unchanged pages are written again too
+        self.force: bool = force or (cache is not None and cache.replay)
+        # Statements are flushed and dropped from the session one by one, build() commits them in chunks
+        # and empties the session once the company is done
+        self.low_memory: bool = low_memory
+        self.responses: Dict[str, bytes] = {}
+        self.db_session: Any = db_session if db_session is not None else session()
+        self.directory: SymbolDirectory = directory or SymbolDirectory(self.db_session.get_bind(), self.db_session)
+        # The search API is only asked about symbols the directory does not know yet
+        self.details: Dict = self.directory.lookup(self.comp_name) or self.__get_comp_details(self.comp_name)
+        self.dimensions: DimensionCache = dimensions or DimensionCache(self.db_session.get_bind(), self.db_session)
+        self.peer_groups: PeerGroups = peer_groups or PeerGroups()
+        self.fingerprints: PageFingerprints = fingerprints or PageFingerprints(self.db_session.get_bind(),
+                                                                               self.db_session)
+        # Fingerprints stored by the previous run, set by fetch() and only compared unless force
+        self.stored: Optional[Dict[str, Any]] = None
+        # consolidated -> digest of the fetched page and the validators it was served with
+        self.hashes: Dict[bool, str] = {}
+        self.validators: Dict[bool, Dict] = {}
+        # Set by fetch() when neither page changed since the previous run
+        self.unchanged: bool = False
+        self.page: Optional[PageIndex] = None
+        self.consolidated_page: Optional[PageIndex] = None
+        # (table data, months table, indexes table, cell table, statement table, consolidated) awaiting write()
+        self.statements: List[Tuple] = []
+        # Peer comparison rows awaiting write() and the peer section text they are shared under
+        self.peers: List[Dict] = []
+        self.peer_industry: str = ""
         self.company_table: Any = CompanyInfo()
 
     def build(self):
-        page = self.__get_content()
+        self.__journal("started")
+        self.fetch()
+        self.__journal("fetched")
+        self.parse()
+        self.__journal("parsed")
+        self.write(CONFIG.LOW_MEMORY_COMMIT_ROWS if self.low_memory else None)
+        with self.metrics.timer("commit"):
+            self.db_session.commit()
+        if self.journal is not None:
+            self.journal.finish(self.comp_name)
+        if self.low_memory:
+            # The identity map starts the next company empty
+            self.db_session.expunge_all()
+        publish(self.hooks, self.comp_name, self.metrics.snapshot())
+
+    def __journal(self, stage: str) -> None:
+        if self.journal is not None:
+            self.journal.stage(self.comp_name, stage)
+
+    # Stages, fetch() only touches the network, parse() neither the network nor the database,
+    # write() only the database and leaves the transaction open
+    @timed("fetch")
+    def fetch(self):
+        self.stored = self.fingerprints.lookup(self.comp_name)
+        compared: Optional[Dict[str, Any]] = None if self.force else self.stored
+        content: Optional[bytes] = self.__fetch_page(compared)
+        if content is not None:
+            self.page = PageIndex(html.fromstring(content))
+        if compared is not None and self.__is_unchanged(compared):
+            # No schedules to expand, parse() and write() only refresh what moves with the share price: top
+            # ratios, ranges and the peer table. A page answered with 304 keeps all of them as stored
+            self.unchanged = True
+            self.metrics.count("pages_unchanged")
+            if self.page is not None:
+                self.__fetch_with_peers(self.page, [])
+            return
+
+        if self.page is None:
+            # Not modified itself, but the consolidated page was
+            self.page = PageIndex(html.fromstring(self.__fetch_page(None)))
+        self.consolidated_page = self.__prefetch(self.page)
+
+    @timed("parse")
+    def parse(self):
+        page: PageIndex = self.page
+        consolidated_page: Optional[PageIndex] = self.consolidated_page
+
+        if self.unchanged:
+            if page is not None:
+                self.__build_links(page)
+                self.__build_company_info(page)
+                self.__build_peers(page)
+                self.__parse_ranges(page)
+            if consolidated_page is not None:
+                self.__parse_ranges(consolidated_page, consolidated=True)
+            self.__build_fingerprints(page, None)
+            self.responses = {}
+            self.page = self.consolidated_page = None
+            return
 
         # Steps
+        self.__build_fingerprints(page, consolidated_page)
         self.__build_links(page)
         self.__build_company_info(page)
         self.__build_peers(page)
@@ -42,45 +161,257 @@ class ToSQL(object):
         self.__build_cash_flows(page)
         self.__build_ratios(page)
         self.__build_shareholding(page)
-        self.__build_compounded_sales_growth(page)
-        self.__build_compounded_profit_growth(page)
-        self.__build_stock_price_cgar(page)
-        self.__build_return_on_quality(page)
+        self.__parse_ranges(page)
 
-        if page.xpath("//a[contains(@href,'consolidated')]"):
-            consolidated_page = self.__get_content(consolidated=True)
+        if consolidated_page is not None:
             self.__build_quarters(consolidated_page, consolidated=True)
             self.__build_profit(consolidated_page, consolidated=True)
             self.__build_balance(consolidated_page, consolidated=True)
             self.__build_cash_flows(consolidated_page, consolidated=True)
             self.__build_ratios(consolidated_page, consolidated=True)
-            self.__build_compounded_sales_growth(consolidated_page, consolidated=True)
-            self.__build_compounded_profit_growth(consolidated_page, consolidated=True)
-            self.__build_stock_price_cgar(consolidated_page, consolidated=True)
-            self.__build_return_on_quality(consolidated_page, consolidated=True)
+            self.__parse_ranges(consolidated_page, consolidated=True)
+
+        # Raw payloads and trees are not needed once parsed
+        self.responses = {}
+        self.page = self.consolidated_page = None
+
+    @timed("write")
+    def write(self, commit_rows: Optional[int] = None):
+        # With commit_rows the transaction is committed whenever that many cells were written since the last
+        # commit, only build() passes it: the pipeline writes several companies in one transaction
+        for name, value in self.scheduler.stats().items():
+            self.metrics.gauge("scheduler_" + name, value)
+        with self.metrics.statements(self.db_session):
+            self.__write(commit_rows)
+
+    def __write(self, commit_rows: Optional[int] = None):
+        self.directory.store(self.db_session, self.comp_name, self.details)
+
+        self.__store_peers()
+        if self.unchanged:
+            self.__refresh()
+            return
+
+        # A company committed in chunks gets its fingerprints with the last one, so an interrupted write is
+        # never taken for an unchanged company by the next run
+        held: Dict[str, Any] = {}
+        if commit_rows:
+            held = {column: getattr(self.company_table, column) for column in FINGERPRINT_COLUMNS}
+            for column in FINGERPRINT_COLUMNS:
+                setattr(self.company_table, column, None)
+
+        exist: Any = self.db_session.query(CompanyInfo).filter(CompanyInfo.nse == self.comp_name).one_or_none()
+
+        if exist and self.incremental:
+            # Statements are diffed against the stored cells, the small per-company rows are rebuilt
+            self.__reset_children(exist)
+            self.__adopt(exist)
+        elif exist:
+            self.db_session.delete(exist)
+            self.db_session.flush()
 
         self.db_session.add(self.company_table)
-        self.db_session.commit()
+        self.db_session.flush()
+
+        written: int = 0
+        while self.statements:
+            # Taken off the list as they go, each parsed statement is released once written
+            statement: Tuple = self.statements.pop(0)
+            data_table_obj: Any = self.__insert_cell(*statement)
+            written += statement[0].values.size
+            if self.low_memory:
+                self.db_session.flush()
+                self.db_session.expunge(data_table_obj)
+            if commit_rows and written >= commit_rows:
+                self.db_session.commit()
+                self.metrics.count("chunk_commits")
+                written = 0
 
+        if held:
+            for column, value in held.items():
+                setattr(self.company_table, column, value)
+            self.db_session.flush()
+
+    @timed("search")
     def __get_comp_details(self, name: str) -> Dict:
         url: str = self.URLS["search_company"].format(name)
-        r: Any = requests.get(url, headers=self.HEADERS)
-        return r.json()
+        return pick(json.loads(self.__fetch(("search_company", url, False))), name)
+
+    def __fetch_page(self, stored: Optional[Dict[str, Any]], consolidated: bool = False) -> Optional[bytes]:
+        # Conditional request with the validators stored for the page, None when it was not modified
+        prefix: str = "consolidated" if consolidated else "page"
+        previous: Dict = stored[prefix] if stored is not None else {}
+        headers: Dict[str, str] = {}
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
+        request: Request = self.__page_request(consolidated)
+        content: Optional[bytes] = self.__download(request, headers)
+        if content is None:
+            self.metrics.count("http_not_modified")
+        else:
+            self.responses[request[1]] = content
+        return content
+
+    def __is_unchanged(self, stored: Dict[str, Any]) -> bool:
+        # The page is None when the server answered 304
+        if self.page is not None and self.__hash(self.page) != stored["page"]["hash"]:
+            return False
+        had_consolidated: bool = stored["consolidated"]["hash"] is not None
+        if self.page is not None and self.page.has_consolidated != had_consolidated:
+            return False
+        if not had_consolidated:
+            return True
+        content: Optional[bytes] = self.__fetch_page(stored, consolidated=True)
+        if content is None:
+            return True
+        # Kept for its ranges when unchanged, rebuilt by __prefetch otherwise
+        self.consolidated_page = PageIndex(html.fromstring(content))
+        return self.__hash(self.consolidated_page, True) == stored["consolidated"]["hash"]
+
+    def __hash(self, page: PageIndex, consolidated: bool = False) -> str:
+        if consolidated not in self.hashes:
+            self.hashes[consolidated] = page_fingerprint(page)
+        return self.hashes[consolidated]
 
     def __get_content(self, consolidated: bool = False) -> Any:
+        parsed: Any = html.fromstring(self.__fetch(self.__page_request(consolidated)))
+        return parsed
+
+    def __page_request(self, consolidated: bool = False) -> Request:
         if not consolidated:
             url: str = self.URLS["main"].format(self.comp_name)
         else:
             url: str = self.URLS["main"].format(self.comp_name) + "/consolidated/"
+        return "main", url, consolidated
 
-        r: Any = requests.get(url, headers=self.HEADERS)
-        parsed: Any = html.fromstring(r.content)
-        return parsed
+    def __peers_request(self, page: PageIndex) -> Request:
+        warehouse_id = page.element("company-info").attrib.get("data-warehouse-id")
+        self.details["warehouse-id"] = warehouse_id
+        return "peers", self.URLS["peers"].format(warehouse_id), False
+
+    def __rows_request(self, parent: str, section: str, consolidated: bool = False) -> Request:
+        if not section:  # Shareholder
+            endpoint: str = "shareholders"
+            url: str = self.URLS["shareholders"].format(self.details["id"], parent)
+        else:
+            endpoint: str = "schedules"
+            url: str = self.URLS["schedules"].format(self.details["id"], parent, section)
+
+        if consolidated:
+            url += "&consolidated="
+        return endpoint, url, consolidated
+
+    def __schedule_requests(self, page: PageIndex, consolidated: bool = False) -> List[Request]:
+        sections: List[str] = self.SECTIONS[:-1] if consolidated else self.SECTIONS
+        requests: List[Request] = []
+        for section_id in sections:
+            table: Optional[Any] = page.table(section_id)
+            if table is None:
+                continue
+            for button in page.buttons(table):
+                parent, section = self.__parse_button(button)
+                requests.append(self.__rows_request(parent, section, consolidated))
+        return requests
+
+    # Fetching
+    def __prefetch(self, page: PageIndex) -> Optional[PageIndex]:
+        # First wave: peers, standalone schedules and the consolidated page, second wave: consolidated schedules
+        has_consolidated: bool = page.has_consolidated
+        requests: List[Request] = self.__schedule_requests(page)
+        if has_consolidated:
+            requests.append(self.__page_request(consolidated=True))
+        self.__fetch_with_peers(page, requests)
+
+        if not has_consolidated:
+            return None
+
+        consolidated_page: PageIndex = PageIndex(self.__get_content(consolidated=True))
+        self.__fetch_all(self.__schedule_requests(consolidated_page, consolidated=True))
+        return consolidated_page
+
+    def __fetch_with_peers(self, page: PageIndex, requests: List[Request]) -> None:
+        # The requests plus the peer table, which is fetched once per industry and run
+        peers: Request = self.__peers_request(page)
+        industry: str = self.__peer_industry(page)
+        # Callers build their requests first, so nothing but the fetch runs while the claim is held
+        shared: Optional[bytes] = self.peer_groups.response(industry) if industry else None
+        try:
+            if shared is not None:
+                # Another company of the industry already fetched the peer table in this run
+                self.responses[peers[1]] = shared
+                self.metrics.count("peer_fetches_shared")
+            self.__fetch_all([peers] + requests)
+        finally:
+            if industry and shared is None:
+                self.peer_groups.remember(industry, self.responses.get(peers[1]))
+
+    def __fetch_all(self, requests: List[Request]) -> None:
+        pending: List[Request] = [r for r in dict.fromkeys(requests) if r[1] not in self.responses]
+        if not pending:
+            return
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for request, content in zip(pending, pool.map(self.__download, pending)):
+                self.responses[request[1]] = content
+
+    def __fetch(self, request: Request) -> bytes:
+        if request[1] in self.responses:
+            return self.responses[request[1]]
+        return self.__download(request)
+
+    def __download(self, request: Request, headers: Optional[Dict[str, str]] = None) -> Optional[bytes]:
+        # None only for a conditional request answered with 304 Not Modified
+        endpoint, url, consolidated = request
+        if self.journal is not None:
+            # Fetched before the run was interrupted
+            content: Optional[bytes] = self.journal.response(self.comp_name, url)
+            if content is not None:
+                self.metrics.count("journal_hits")
+                return content
+        if self.cache is not None:
+            content: Optional[bytes] = self.cache.get(endpoint, url, consolidated)
+            if content is not None:
+                self.metrics.count("cache_hits")
+                return content
+
+        r: Any = self.scheduler.request(
+            endpoint, lambda: self.client.get(url, headers=headers) if headers else self.client.get(url), self.metrics)
+        self.metrics.count("http_requests")
+        if headers and r.status_code == 304:
+            return None
+        if endpoint == "main":
+            self.validators[consolidated] = validators(r)
+        self.metrics.count("http_bytes", len(r.content))
+        if self.cache is not None:
+            self.cache.put(endpoint, url, r.content, consolidated)
+        if self.journal is not None:
+            self.journal.record(self.comp_name, url, r.content)
+        return r.content
 
     # Operations
-    def __build_links(self, page: Any):
-        xp: str = "//div[@id='top']"
-        el: Any = page.xpath(xp)[0]
+    @timed("build_fingerprints")
+    def __build_fingerprints(self, page: Optional[PageIndex], consolidated_page: Optional[PageIndex]):
+        # An unchanged company keeps its stored digests, and its stored validators for a page that was
+        # not modified. A page read from the cache or the journal was not served with any, it keeps the stored ones
+        for prefix, consolidated, parsed in (("page", False, page), ("consolidated", True, consolidated_page)):
+            previous: Dict = self.stored[prefix] if self.stored is not None else {}
+            if self.unchanged:
+                digest: Optional[str] = previous["hash"]
+            else:
+                digest: Optional[str] = self.__hash(parsed, consolidated) if parsed is not None else None
+            fetched: Dict = self.validators.get(consolidated) or (previous if digest is not None else {})
+            etag: Optional[str] = fetched.get("etag")
+            last_modified: Optional[str] = fetched.get("last_modified")
+            setattr(self.company_table, prefix + "_hash", digest)
+            setattr(self.company_table, prefix + "_etag", etag[:LABEL_LENGTH] if etag else None)
+            setattr(self.company_table, prefix + "_last_modified",
+                    last_modified[:VALUE_LENGTH] if last_modified else None)
+
+    @timed("build_links")
+    def __build_links(self, page: PageIndex):
+        el: Any = page.element("top")
         title_xp: str = "div/h1"
         title: str = el.xpath(title_xp)[0].text_content()
         links_xp: str = "div[2]/a/span"
@@ -107,9 +438,9 @@ class ToSQL(object):
 
         return
 
-    def __build_company_info(self, page: Any):
-        ratios_xp: str = "//ul[@id='top-ratios']"
-        ul: Any = page.xpath(ratios_xp)[0]
+    @timed("build_company_info")
+    def __build_company_info(self, page: PageIndex):
+        ul: Any = page.element("top-ratios")
         values: List[str] = []
 
         for el in ul.xpath("./li/span[@class='nowrap value']"):
@@ -117,6 +448,9 @@ class ToSQL(object):
             value: str = self.__string_fix(string)
             values.append(value)
 
+        numbers, _ = normalize(values)
+        high_low, _ = normalize((values[2].split("/") + [""])[:2])
+
         self.company_table.market_cap = values[0]
         self.company_table.current_price = values[1]
         self.company_table.high_low = values[2]
@@ -127,37 +461,52 @@ class ToSQL(object):
         self.company_table.roe = values[7]
         self.company_table.face_value = values[8]
 
+        self.company_table.market_cap_num = to_float(numbers[0])
+        self.company_table.current_price_num = to_float(numbers[1])
+        self.company_table.high = to_float(high_low[0])
+        self.company_table.low = to_float(high_low[1])
+        self.company_table.stock_p_e_num = to_float(numbers[3])
+        self.company_table.book_value_num = to_float(numbers[4])
+        self.company_table.dividend_yield_num = to_float(numbers[5])
+        self.company_table.roce_num = to_float(numbers[6])
+        self.company_table.roe_num = to_float(numbers[7])
+        self.company_table.face_value_num = to_float(numbers[8])
+
         return
 
-    def __build_peers_info(self, page: Any):
-        xp: str = "//section[@id='peers']"
-        el: Any = page.xpath(xp)[0]
-        title_xp: str = "//section[@id='peers']//h2"
+    @timed("build_peers_info")
+    def __build_peers_info(self, page: PageIndex):
+        el: Any = page.element("peers")
+        title_xp: str = ".//h2"
         title: str = el.xpath(title_xp)[0].text
         title = title + "\n"
         p: Any = el.xpath(".//p")[0]
         trick: List[str] = p.text_content().replace(" ", "").replace("\n", "").split("Industry")
         trick[1]: str = "Industry" + trick[1]
         trick: List[str] = [el.replace(":", ": ") for el in trick]
+        import pandas as pd
         peers_head_df: Any = pd.DataFrame(trick)
         return peers_head_df
 
-    def __build_peers(self, page: Any):
-        warehouse_id = page.xpath("//div[@id='company-info']")[0].attrib.get("data-warehouse-id")
-        self.details["warehouse-id"] = warehouse_id
-
-        peers_url = self.URLS["peers"].format(warehouse_id)
-        peers_res = requests.get(peers_url, headers=self.HEADERS)
-        parsed = html.fromstring(peers_res.content)
+    @staticmethod
+    def __peer_industry(page: PageIndex) -> str:
+        # "Sector: ... Industry: ..." above the peer table, empty when the page has none
+        section: Optional[Any] = page.elements.get("peers")
+        paragraphs: List[Any] = section.xpath(".//p") if section is not None else []
+        return " ".join(paragraphs[0].text_content().split())[:LABEL_LENGTH] if paragraphs else ""
+
+    @timed("build_peers")
+    def __build_peers(self, page: PageIndex):
+        self.peer_industry = self.__peer_industry(page)
+        parsed = html.fromstring(self.__fetch(self.__peers_request(page)))
         table = parsed.xpath(".//table")[0]
-        peers_df = pd.DataFrame(pd.read_html(html.tostring(table, pretty_print=True))[0])
-        peers_df.fillna(0, inplace=True)
-        peers_df["S.No."] = peers_df["S.No."].astype(int)
-
-        for value in peers_df.values:
-            peer_record = PeerComparison(
-                s_no=value[0],
-                name=value[1],
+        _, rows = extract_rows(table)
+        numbers, _ = normalize(rows)
+
+        for row, value in zip(rows, np.nan_to_num(numbers).tolist()):
+            peer_record: Dict = dict(
+                s_no=int(value[0]),
+                name=row[1],
                 current_price=value[2],
                 price_to_earning=value[3],
                 market_cap=value[4],
@@ -168,12 +517,19 @@ class ToSQL(object):
                 yoy_sales_growth=value[9],
                 roce=value[10],
             )
-            self.company_table.peer.append(peer_record)
+            self.peers.append(peer_record)
         return
 
-    def __build_quarters(self, page: Any, consolidated: bool = False):
-        quarters_table: Any = page.xpath("//section[@id='quarters']//table")[0]
-        buttons: Any = quarters_table.xpath(".//button[@onclick]")
+    def __parse_ranges(self, page: PageIndex, consolidated: bool = False):
+        self.__build_compounded_sales_growth(page, consolidated=consolidated)
+        self.__build_compounded_profit_growth(page, consolidated=consolidated)
+        self.__build_stock_price_cgar(page, consolidated=consolidated)
+        self.__build_return_on_quality(page, consolidated=consolidated)
+
+    @timed("build_quarters")
+    def __build_quarters(self, page: PageIndex, consolidated: bool = False):
+        quarters_table: Any = page.table("quarters")
+        buttons: Any = page.buttons(quarters_table)
         for button in buttons:
             tr: Any = button.getparent().getparent()
             parent, section = self.__parse_button(button)
@@ -181,56 +537,49 @@ class ToSQL(object):
         tbody: Any = quarters_table.xpath(".//tbody")[0]
         last_tr: Any = tbody.xpath("./tr[last()]")[0]
         tbody.remove(last_tr)
-        pd_html: Any = pd.read_html(html.tostring(quarters_table, pretty_print=True))[0]
-        quarters_df: Any = pd_html.set_index("Unnamed: 0", drop=True)
-        quarters_df.index = quarters_df.index.str.replace("+", "")
-        quarters_df.fillna(0, inplace=True)
+        quarters_data: Table = extract_table(quarters_table)
 
-        self.__insert_months(quarters_df.columns, QuarterlyMonths)
-        self.__insert_indexes(quarters_df.index, QuarterlyIndexes)
+        self.statements.append((quarters_data, QuarterlyMonths, QuarterlyIndexes, QuarterlyCell,
+                                QuarterlyResults, consolidated))
 
-        quarterly_table = self.__insert_cell(quarters_df, QuarterlyMonths, QuarterlyIndexes, QuarterlyCell,
-                                             QuarterlyResults, consolidated=consolidated)
+        return quarters_data
 
-        self.company_table.quarterly_results.append(quarterly_table)
-        return quarters_df
-
-    def __build_profit(self, page: Any, consolidated: bool = False):
-        profit_table: Any = page.xpath("//section[@id='profit-loss']/div[@data-result-table]/table")[0]
-        buttons: Any = profit_table.xpath(".//button[@onclick]")
+    @timed("build_profit")
+    def __build_profit(self, page: PageIndex, consolidated: bool = False):
+        profit_table: Any = page.table("profit-loss")
+        buttons: Any = page.buttons(profit_table)
         for button in buttons:
             tr: Any = button.getparent().getparent()
             parent, section = self.__parse_button(button)
             self.__alter_table(tr, parent, section, consolidated=consolidated)
 
-        pd_html: Any = pd.read_html(html.tostring(profit_table))[0]
-        profit_df: Any = pd_html.set_index("Unnamed: 0", drop=True)
-        profit_df.fillna(0, inplace=True)
-        profit_df.index = profit_df.index.str.replace("+", "")
-
-        self.__insert_months(profit_df.columns, ProfitLossMonths)
-        self.__insert_indexes(profit_df.index, ProfitLossIndexes)
+        profit_data: Table = extract_table(profit_table)
 
-        profit_table = self.__insert_cell(profit_df, ProfitLossMonths, ProfitLossIndexes, ProfitLossCell,
-                                          ProfitLoss, consolidated=consolidated)
+        self.statements.append((profit_data, ProfitLossMonths, ProfitLossIndexes, ProfitLossCell,
+                                ProfitLoss, consolidated))
 
-        self.company_table.profit_loss.append(profit_table)
-        return profit_table
+        return profit_data
 
-    def __build_compounded_sales_growth(self, page: Any, consolidated=False):
-        table_range_1: Any = page.xpath("//table[@class='ranges-table']")[0]
-        table_range_1_df = pd.read_html(html.tostring(table_range_1))[0]
+    @timed("build_compounded_sales_growth")
+    def __build_compounded_sales_growth(self, page: PageIndex, consolidated=False):
+        table_range_1: Any = page.ranges[0]
+        _, rows = extract_rows(table_range_1)
+        numbers, _ = normalize([row[1] for row in rows[:4]])
 
-        ten_years = table_range_1_df[table_range_1_df.columns[1]][0]
-        five_years = table_range_1_df[table_range_1_df.columns[1]][1]
-        three_years = table_range_1_df[table_range_1_df.columns[1]][2]
-        ttm = table_range_1_df[table_range_1_df.columns[1]][3]
+        ten_years = rows[0][1]
+        five_years = rows[1][1]
+        three_years = rows[2][1]
+        ttm = rows[3][1]
 
         table = CompoundedSalesGrowth(
             ten_years=ten_years,
             five_years=five_years,
             three_years=three_years,
             TTM=ttm,
+            ten_years_num=to_float(numbers[0]),
+            five_years_num=to_float(numbers[1]),
+            three_years_num=to_float(numbers[2]),
+            TTM_num=to_float(numbers[3]),
             consolidated=consolidated
         )
 
@@ -241,20 +590,26 @@ class ToSQL(object):
 
         return
 
-    def __build_compounded_profit_growth(self, page: Any, consolidated=False):
-        table_range_2: Any = page.xpath("//table[@class='ranges-table']")[1]
-        table_range_2_df = pd.read_html(html.tostring(table_range_2))[0]
+    @timed("build_compounded_profit_growth")
+    def __build_compounded_profit_growth(self, page: PageIndex, consolidated=False):
+        table_range_2: Any = page.ranges[1]
+        _, rows = extract_rows(table_range_2)
+        numbers, _ = normalize([row[1] for row in rows[:4]])
 
-        ten_years = table_range_2_df[table_range_2_df.columns[1]][0]
-        five_years = table_range_2_df[table_range_2_df.columns[1]][1]
-        three_years = table_range_2_df[table_range_2_df.columns[1]][2]
-        ttm = table_range_2_df[table_range_2_df.columns[1]][3]
+        ten_years = rows[0][1]
+        five_years = rows[1][1]
+        three_years = rows[2][1]
+        ttm = rows[3][1]
 
         table = CompoundedProfitGrowth(
             ten_years=ten_years,
             five_years=five_years,
             three_years=three_years,
             TTM=ttm,
+            ten_years_num=to_float(numbers[0]),
+            five_years_num=to_float(numbers[1]),
+            three_years_num=to_float(numbers[2]),
+            TTM_num=to_float(numbers[3]),
             consolidated=consolidated
         )
 
@@ -265,20 +620,26 @@ class ToSQL(object):
 
         return
 
-    def __build_stock_price_cgar(self, page: Any, consolidated=False):
-        table_range_3: Any = page.xpath("//table[@class='ranges-table']")[2]
-        table_range_3_df = pd.read_html(html.tostring(table_range_3))[0]
+    @timed("build_stock_price_cgar")
+    def __build_stock_price_cgar(self, page: PageIndex, consolidated=False):
+        table_range_3: Any = page.ranges[2]
+        _, rows = extract_rows(table_range_3)
+        numbers, _ = normalize([row[1] for row in rows[:4]])
 
-        ten_years = table_range_3_df[table_range_3_df.columns[1]][0]
-        five_years = table_range_3_df[table_range_3_df.columns[1]][1]
-        three_years = table_range_3_df[table_range_3_df.columns[1]][2]
-        one_year = table_range_3_df[table_range_3_df.columns[1]][3]
+        ten_years = rows[0][1]
+        five_years = rows[1][1]
+        three_years = rows[2][1]
+        one_year = rows[3][1]
 
         table = StockPriceCAGR(
             ten_years=ten_years,
             five_years=five_years,
             three_years=three_years,
             one_year=one_year,
+            ten_years_num=to_float(numbers[0]),
+            five_years_num=to_float(numbers[1]),
+            three_years_num=to_float(numbers[2]),
+            one_year_num=to_float(numbers[3]),
             consolidated=consolidated
         )
 
@@ -289,20 +650,26 @@ class ToSQL(object):
 
         return
 
-    def __build_return_on_quality(self, page: Any, consolidated=False):
-        table_range_4: Any = page.xpath("//table[@class='ranges-table']")[3]
-        table_range_4_df = pd.read_html(html.tostring(table_range_4))[0]
+    @timed("build_return_on_quality")
+    def __build_return_on_quality(self, page: PageIndex, consolidated=False):
+        table_range_4: Any = page.ranges[3]
+        _, rows = extract_rows(table_range_4)
+        numbers, _ = normalize([row[1] for row in rows[:4]])
 
-        ten_years = table_range_4_df[table_range_4_df.columns[1]][0]
-        five_years = table_range_4_df[table_range_4_df.columns[1]][1]
-        three_years = table_range_4_df[table_range_4_df.columns[1]][2]
-        last_year = table_range_4_df[table_range_4_df.columns[1]][3]
+        ten_years = rows[0][1]
+        five_years = rows[1][1]
+        three_years = rows[2][1]
+        last_year = rows[3][1]
 
         table = ReturnOnQuality(
             ten_years=ten_years,
             five_years=five_years,
             three_years=three_years,
             last_year=last_year,
+            ten_years_num=to_float(numbers[0]),
+            five_years_num=to_float(numbers[1]),
+            three_years_num=to_float(numbers[2]),
+            last_year_num=to_float(numbers[3]),
             consolidated=consolidated
         )
 
@@ -313,99 +680,73 @@ class ToSQL(object):
 
         return
 
-    def __build_balance(self, page: Any, consolidated: bool = False):
-        balance_table: Any = page.xpath("//section[@id='balance-sheet']//table")[0]
-        buttons: Any = balance_table.xpath(".//button[@onclick]")
+    @timed("build_balance")
+    def __build_balance(self, page: PageIndex, consolidated: bool = False):
+        balance_table: Any = page.table("balance-sheet")
+        buttons: Any = page.buttons(balance_table)
         for button in buttons:
             tr: Any = button.getparent().getparent()
             parent, section = self.__parse_button(button)
             self.__alter_table(tr, parent, section, consolidated=consolidated)
 
-        pd_html: Any = pd.read_html(html.tostring(balance_table))[0]
-        balance_df: Any = pd_html.set_index("Unnamed: 0", drop=True)
-        balance_df.fillna(0, inplace=True)
-        balance_df.index = balance_df.index.str.replace("+", "")
+        balance_data: Table = extract_table(balance_table)
 
-        self.__insert_months(balance_df.columns, BalanceSheetMonths)
-        self.__insert_indexes(balance_df.index, BalanceSheetIndexes)
+        self.statements.append((balance_data, BalanceSheetMonths, BalanceSheetIndexes, BalanceSheetCell,
+                                BalanceSheet, consolidated))
 
-        balance_table = self.__insert_cell(balance_df, BalanceSheetMonths, BalanceSheetIndexes, BalanceSheetCell,
-                                           BalanceSheet, consolidated=consolidated)
+        return balance_data
 
-        self.company_table.balance_sheet.append(balance_table)
-        return balance_table
-
-    def __build_cash_flows(self, page: Any, consolidated: bool = False):
-        cash_flows_table: Any = page.xpath("//section[@id='cash-flow']//table")[0]
-        buttons: Any = cash_flows_table.xpath(".//button[@onclick]")
+    @timed("build_cash_flows")
+    def __build_cash_flows(self, page: PageIndex, consolidated: bool = False):
+        cash_flows_table: Any = page.table("cash-flow")
+        buttons: Any = page.buttons(cash_flows_table)
         for button in buttons:
             tr: Any = button.getparent().getparent()
             parent, section = self.__parse_button(button)
             self.__alter_table(tr, parent, section, consolidated=consolidated)
 
-        pd_html: Any = pd.read_html(html.tostring(cash_flows_table))[0]
-        cash_flows_df: Any = pd_html.set_index("Unnamed: 0", drop=True)
-        cash_flows_df.fillna(0, inplace=True)
-        cash_flows_df.index = cash_flows_df.index.str.replace("+", "")
-
-        self.__insert_months(cash_flows_df.columns, CashFlowMonths)
-        self.__insert_indexes(cash_flows_df.index, CashFlowIndexes)
+        cash_flows_data: Table = extract_table(cash_flows_table)
 
-        cash_flow_table = self.__insert_cell(cash_flows_df, CashFlowMonths, CashFlowIndexes, CashFlowCell,
-                                             CashFlow, consolidated=consolidated)
+        self.statements.append((cash_flows_data, CashFlowMonths, CashFlowIndexes, CashFlowCell,
+                                CashFlow, consolidated))
 
-        self.company_table.cash_flow.append(cash_flow_table)
-        return cash_flow_table
+        return cash_flows_data
 
-    def __build_ratios(self, page: Any, consolidated: bool = False):
-        ratios_table: Any = page.xpath("//section[@id='ratios']//table")[0]
-        buttons: Any = ratios_table.xpath(".//button[@onclick]")
+    @timed("build_ratios")
+    def __build_ratios(self, page: PageIndex, consolidated: bool = False):
+        ratios_table: Any = page.table("ratios")
+        buttons: Any = page.buttons(ratios_table)
         for button in buttons:
             tr: Any = button.getparent().getparent()
             parent, section = self.__parse_button(button)
             self.__alter_table(tr, parent, section, consolidated=consolidated)
 
-        pd_html: Any = pd.read_html(html.tostring(ratios_table))[0]
-        ratios_df: Any = pd_html.set_index("Unnamed: 0", drop=True)
-        ratios_df.fillna(0, inplace=True)
-        ratios_df.index = ratios_df.index.str.replace("+", "")
+        ratios_data: Table = extract_table(ratios_table)
 
-        self.__insert_months(ratios_df.columns, RatiosMonths)
-        self.__insert_indexes(ratios_df.index, RatiosIndexes)
+        self.statements.append((ratios_data, RatiosMonths, RatiosIndexes, RatiosCell,
+                                Ratios, consolidated))
 
-        ratios_table = self.__insert_cell(ratios_df, RatiosMonths, RatiosIndexes, RatiosCell,
-                                          Ratios, consolidated=consolidated)
+        return ratios_data
 
-        self.company_table.ratios.append(ratios_table)
-        return ratios_table
+    @timed("build_shareholding")
+    def __build_shareholding(self, page: PageIndex):
 
-    def __build_shareholding(self, page: Any):
-
-        if not page.xpath("//section[@id='shareholding']//table"):
+        shareholding_table: Any = page.table("shareholding")
+        if shareholding_table is None:
             return
-        else:
-            shareholding_table: Any = page.xpath("//section[@id='shareholding']//table")[0]
 
-        buttons: Any = shareholding_table.xpath(".//button[@onclick]")
+        buttons: Any = page.buttons(shareholding_table)
         for button in buttons:
             tr: Any = button.getparent().getparent()
             parent, section = self.__parse_button(button)
             self.__alter_table(tr, parent, section)
 
-        pd_html: Any = pd.read_html(html.tostring(shareholding_table))[0]
-        shareholding_df: Any = pd_html.set_index("Unnamed: 0", drop=True)
-        shareholding_df.fillna(0, inplace=True)
-        shareholding_df.index = shareholding_df.index.str.replace("+", "")
+        shareholding_data: Table = extract_table(shareholding_table)
 
-        self.__insert_months(shareholding_df.columns, ShareholdingMonths)
-        self.__insert_indexes(shareholding_df.index, ShareholdingIndexes)
+        self.statements.append((shareholding_data, ShareholdingMonths, ShareholdingIndexes, ShareholdingCell,
+                                Shareholding, False))
 
-        shareholding_table = self.__insert_cell(shareholding_df, ShareholdingMonths, ShareholdingIndexes,
-                                                ShareholdingCell,
-                                                Shareholding)
-
-        self.company_table.shareholding.append(shareholding_table)
-        return shareholding_table
+        return shareholding_data
 
     def __alter_table(self, tr: Any, parent: str, section: str, consolidated: bool = False) -> Any:
         rows: Any = self.__get_new_rows(parent, section, consolidated)
@@ -418,38 +759,24 @@ class ToSQL(object):
         for row, items in rows.items():
             if "setAttributes" in items.keys():
                 items.__delitem__("setAttributes")
-            new_tr: Any = ET.XML("<tr></tr>")
-            tds: List[Any] = []
-            # new_td: Any = ET.XML("<td>{}</td>".format(row))
-            new_td: Any = html.fromstring("<td>{}</td>".format(row))
-            tds.append(new_td)
+            # Cells are created as elements directly, there is no markup to parse
+            new_tr: Any = ET.Element("tr")
+            ET.SubElement(new_tr, "td").text = str(row)
 
             for item_k, item_v in items.items():
                 if item_k in temp_data.keys():
                     temp_data[item_k] = item_v
 
             for k, v in temp_data.items():
-                # new_td: Any = ET.XML("<td>{}</td>".format(v))
-                new_td: Any = html.fromstring("<td>{}</td>".format(v))
-                tds.append(new_td)
+                ET.SubElement(new_tr, "td").text = str(v)
 
-            new_tr.extend(tds)
             trs.append(new_tr)
         tr.extend(trs)
         return
 
+    @timed("get_new_rows")
     def __get_new_rows(self, parent, section, consolidated: bool = False):
-
-        if not section:  # Shareholder
-            url: str = self.URLS["shareholders"].format(self.details["id"], parent)
-        else:
-            url: str = self.URLS["schedules"].format(self.details["id"], parent, section)
-
-        if consolidated:
-            url += "&consolidated="
-
-        res: Any = requests.get(url, headers=self.HEADERS)
-        return res.json()
+        return json.loads(self.__fetch(self.__rows_request(parent, section, consolidated)))
 
     @staticmethod
     def __string_fix(string: str) -> str:
@@ -480,32 +807,129 @@ class ToSQL(object):
             t = tuple(arr)
         return t
 
-    def __insert_months(self, columns, table):
-        for col in columns:
-            if not self.db_session.query(table).filter(table.month == col).one_or_none():
-                new_month = table(month=col)
-                self.db_session.add(new_month)
-                self.db_session.commit()
+    def __insert_cell(self, data: Table, months_table, index_table, cell_table, data_table, consolidated=False):
 
-    def __insert_indexes(self, index, table):
-        for idx in index:
-            if not self.db_session.query(table).filter(table.name == idx).one_or_none():
-                new_index = table(name=idx)
-                self.db_session.add(new_index)
-                self.db_session.commit()
+        month_ids: Dict[str, int] = self.dimensions.resolve(months_table, data.columns)
+        index_ids: Dict[str, int] = self.dimensions.resolve(index_table, data.index)
 
-    def __insert_cell(self, df, months_table, index_table, cell_table, data_table, consolidated=False):
-
-        data_table_obj = data_table(consolidated=consolidated)
-
-        for month, col in df.items():
-            month_obj = self.db_session.query(months_table).filter(months_table.month == month).one()
-            for idx, value in col.items():
-                index_obj = self.db_session.query(index_table).filter(
-                    index_table.name == idx).one()
-
-                cell = cell_table(idx=index_obj, month=month_obj, value=value)
-
-                data_table_obj.cells.append(cell)
+        data_table_obj = None
+        if self.incremental and self.company_table.id is not None:
+            data_table_obj = self.db_session.query(data_table).filter(
+                data_table.company == self.company_table.id, data_table.consolidated == consolidated).first()
 
+        if data_table_obj is None:
+            # The parent row is flushed first so its id can go into the plain cell rows
+            data_table_obj = data_table(company=self.__company_id(), consolidated=consolidated)
+            self.db_session.add(data_table_obj)
+            self.db_session.flush([data_table_obj])
+            stored: List[Tuple[int, int, int, str]] = []
+        else:
+            stored: List[Tuple[int, int, int, str]] = self.__stored_cells(cell_table, data_table_obj.id)
+
+        cells: List[Tuple[int, int, str, Optional[float], Optional[str]]] = []
+        for j, month in enumerate(data.columns):
+            month_id: int = month_ids[month]
+            for i, idx in enumerate(data.index):
+                cells.append((index_ids[idx], month_id, data.text[i, j], to_float(data.values[i, j]),
+                              data.units[i, j]))
+
+        stored_by_key: Dict[Tuple[int, int], Tuple[int, str]] = {
+            (index_id, month_id): (cell_id, value) for cell_id, index_id, month_id, value in stored}
+        new_keys: set = {(index_id, month_id) for index_id, month_id, _, _, _ in cells}
+        if len(new_keys) < len(cells) or len(stored_by_key) < len(stored):
+            # A label repeated within the statement (the same investor under two shareholder categories) cannot be
+            # matched cell by cell, every cell of the statement is rewritten
+            inserts: List[Dict] = [{"index_id": index_id, "month_id": month_id, "table_id": data_table_obj.id,
+                                    "value": value, "value_num": value_num, "unit": unit}
+                                   for index_id, month_id, value, value_num, unit in cells]
+            updates: List[Dict] = []
+            deletes: List[int] = [cell_id for cell_id, _, _, _ in stored]
+        else:
+            inserts: List[Dict] = []
+            updates: List[Dict] = []
+            for index_id, month_id, value, value_num, unit in cells:
+                if (index_id, month_id) not in stored_by_key:
+                    inserts.append({"index_id": index_id, "month_id": month_id, "table_id": data_table_obj.id,
+                                    "value": value, "value_num": value_num, "unit": unit})
+                elif stored_by_key[(index_id, month_id)][1] != value:
+                    updates.append({"cell_id": stored_by_key[(index_id, month_id)][0], "new_value": value,
+                                    "new_value_num": value_num, "new_unit": unit})
+            deletes: List[int] = [cell_id for key, (cell_id, _) in stored_by_key.items() if key not in new_keys]
+
+        bulk_insert(self.db_session, cell_table, inserts)
+        self.__bulk_update(cell_table, updates)
+        self.__bulk_delete(cell_table, deletes)
+        self.metrics.count("rows_inserted", len(inserts))
+        self.metrics.count("rows_updated", len(updates))
+        self.metrics.count("rows_deleted", len(deletes))
         return data_table_obj
+
+    def __stored_cells(self, cell_table, table_id: int) -> List[Tuple[int, int, int, str]]:
+        # (cell id, index id, month id, value) of every stored cell
+        query: Any = select(cell_table.id, cell_table.index_id, cell_table.month_id, cell_table.value).where(
+            cell_table.table_id == table_id)
+        return [tuple(row) for row in self.db_session.execute(query)]
+
+    def __reset_children(self, company: Any) -> None:
+        for table in (PeerComparison, CompoundedSalesGrowth, CompoundedProfitGrowth, StockPriceCAGR, ReturnOnQuality):
+            self.db_session.query(table).filter(table.company == company.id).delete(synchronize_session=False)
+        self.db_session.expire(company)
+
+    def __store_peers(self) -> None:
+        if self.peers:
+            group_id, inserted = self.peer_groups.store(self.db_session, self.peer_industry, self.peers)
+            self.company_table.peer_group_id = group_id
+            self.metrics.count("rows_inserted", len(self.peers) if inserted else 0)
+        self.peers = []
+
+    def __refresh(self) -> None:
+        # Unchanged company: only what parse() rebuilt is written onto the stored row, the ranges of each
+        # page parsed again replace the stored ones
+        # The row whose fingerprints matched, its symbol may differ from comp_name in case
+        exist: Any = self.db_session.query(CompanyInfo).filter(CompanyInfo.nse == self.stored["nse"]).one()
+        rebuilt: set = {child.consolidated for relation in self.CHILDREN
+                        for child in getattr(self.company_table, relation)}
+        for table in (CompoundedSalesGrowth, CompoundedProfitGrowth, StockPriceCAGR, ReturnOnQuality):
+            for consolidated in rebuilt:
+                self.db_session.query(table).filter(table.company == exist.id, table.consolidated == consolidated) \
+                    .delete(synchronize_session=False)
+        if self.company_table.peer_group_id is not None:
+            # Rows stored under the company itself predate peer groups
+            self.db_session.query(PeerComparison).filter(PeerComparison.company == exist.id) \
+                .delete(synchronize_session=False)
+        self.db_session.expire(exist)
+        self.__adopt(exist, partial=True)
+        self.db_session.flush()
+
+    def __adopt(self, company: Any, partial: bool = False) -> None:
+        # Moves what parse() collected onto the stored company row, so it is updated in place. partial keeps
+        # the stored value of every column parse() left empty
+        for column in CompanyInfo.__table__.columns:
+            value: Any = getattr(self.company_table, column.key)
+            if column.key != "id" and (value is not None or not partial):
+                setattr(company, column.key, value)
+        # Children are detached first, otherwise the backrefs would cascade the parsed row into the session
+        children: Dict[str, List[Any]] = {relation: list(getattr(self.company_table, relation))
+                                          for relation in self.CHILDREN}
+        for relation in self.CHILDREN:
+            setattr(self.company_table, relation, [])
+        for relation, items in children.items():
+            getattr(company, relation).extend(items)
+        self.company_table = company
+
+    def __company_id(self) -> int:
+        if self.company_table.id is None:
+            self.db_session.add(self.company_table)
+            self.db_session.flush([self.company_table])
+        return self.company_table.id
+
+    def __bulk_update(self, table, rows: List[Dict]) -> None:
+        statement: Any = table.__table__.update().where(table.__table__.c.id == bindparam("cell_id")).values(
+            value=bindparam("new_value"), value_num=bindparam("new_value_num"), unit=bindparam("new_unit"))
+        for start in range(0, len(rows), CONFIG.BULK_CHUNK_SIZE):
+            self.db_session.execute(statement, rows[start:start + CONFIG.BULK_CHUNK_SIZE])
+
+    def __bulk_delete(self, table, ids: List[int]) -> None:
+        # Kept well under the bound parameter limits of SQL Server
+        for start in range(0, len(ids), 1000):
+            self.db_session.execute(table.__table__.delete().where(table.__table__.c.id.in_(ids[start:start + 1000])))
@@ -1,4 +1,4 @@
-from models.tables import Base, engine
+from models.tables import Base, get_engine
 
-Base.metadata.create_all(bind=engine)
+Base.metadata.create_all(bind=get_engine())
 